@@ -0,0 +1,176 @@
+# Headless batch analysis of positions and games.
+#
+# Reads FEN/EPD lines or PGN games, fans chunks of them out to worker
+# processes and streams one result row per position to JSONL or CSV:
+# in_check, checkmate, stalemate and the number of legal moves.
+#
+# At most --max-inflight chunks are queued at any time, so a slow writer or
+# slow workers hold back the reader instead of letting work pile up in
+# memory. Rows are written in input order.
+#
+#   python analyze.py positions.epd -o results.jsonl
+#   python analyze.py games.pgn --format csv --workers 16 -o results.csv
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pgn
+from models import Board
+
+FIELDS = ["source", "fen", "in_check", "checkmate", "stalemate", "legal_moves"]
+
+
+def _analyze_board(board, source):
+    color = board.turn
+    legal_moves = sum(1 for _ in board.generate_legal_moves(color))
+    in_check = board.is_in_check(color)
+    return {
+        "source": source,
+        "fen": board.to_fen(),
+        "in_check": in_check,
+        "checkmate": in_check and legal_moves == 0,
+        "stalemate": not in_check and legal_moves == 0,
+        "legal_moves": legal_moves,
+    }
+
+
+def _analyze_chunk(chunk):
+    # Runs in a worker: returns the rows for the chunk and the time spent on them
+    start = time.perf_counter()
+    rows = []
+    for item in chunk:
+        # Any failure only costs the item its own rows: it becomes an error row and the run goes on
+        if item[0] == "fen":
+            _, source, fen = item
+            try:
+                rows.append(_analyze_board(Board.from_fen(fen), source))
+            except Exception as error:
+                rows.append({"source": source, "error": str(error) or type(error).__name__})
+        else:
+            _, source, headers, moves = item
+            ply = 0
+            try:
+                board = Board.from_fen(headers["FEN"]) if "FEN" in headers else Board()
+                rows.append(_analyze_board(board, f"{source}:0"))
+                for ply, san in enumerate(moves, start=1):
+                    start_pos, end_pos = pgn.san_to_move(board, san)
+                    if not board.move_piece(start_pos, end_pos):
+                        raise pgn.PGNError(f"Move {san!r} rejected in {board.to_fen()}")
+                    board.switch_turn()
+                    rows.append(_analyze_board(board, f"{source}:{ply}"))
+            except Exception as error:
+                rows.append({"source": f"{source}:{ply}", "error": str(error) or type(error).__name__})
+    return rows, time.perf_counter() - start
+
+
+def read_items(path):
+    """ Yields ('fen', source, fen) for position files or ('game', source, headers, moves) for PGN """
+    with open(path, encoding="utf-8", errors="replace") as stream:
+        if path.lower().endswith(".pgn"):
+            for number, game in enumerate(pgn.read_games(stream), start=1):
+                yield "game", f"game{number}", game.headers, game.moves
+        else:
+            for number, line in enumerate(stream, start=1):
+                # EPD operations after the fourth field are ignored
+                fields = line.split(";")[0].split()
+                if fields and not fields[0].startswith("#"):
+                    yield "fen", f"line{number}", " ".join(fields[:6])
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _RowWriter:
+    def __init__(self, stream, output_format):
+        self.stream = stream
+        self.csv = csv.DictWriter(stream, FIELDS + ["error"], extrasaction="ignore") if output_format == "csv" else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, rows):
+        if self.csv:
+            self.csv.writerows(rows)
+        else:
+            self.stream.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+def run(path, out, output_format="jsonl", workers=None, chunk_size=256, max_inflight=None):
+    """ Analyzes every position in path and writes rows to out; returns the stats dict """
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or 2 * workers
+    writer = _RowWriter(out, output_format)
+    stats = {"positions": 0, "errors": 0, "read_s": 0.0, "analyze_s": 0.0, "wait_s": 0.0, "write_s": 0.0}
+    start = time.perf_counter()
+
+    def drain(future):
+        wait_start = time.perf_counter()
+        rows, analyze_time = future.result()
+        write_start = time.perf_counter()
+        stats["wait_s"] += write_start - wait_start
+        stats["analyze_s"] += analyze_time
+        writer.write(rows)
+        stats["write_s"] += time.perf_counter() - write_start
+        stats["positions"] += sum(1 for row in rows if "error" not in row)
+        stats["errors"] += sum(1 for row in rows if "error" in row)
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = _chunks(read_items(path), chunk_size)
+        while True:
+            read_start = time.perf_counter()
+            chunk = next(chunks, None)
+            stats["read_s"] += time.perf_counter() - read_start
+            if chunk is None:
+                break
+            # Backpressure: wait for the oldest chunk before queueing another
+            if len(pending) >= max_inflight:
+                drain(pending.popleft())
+            pending.append(pool.submit(_analyze_chunk, chunk))
+        while pending:
+            drain(pending.popleft())
+
+    stats["total_s"] = time.perf_counter() - start
+    stats["positions_per_s"] = stats["positions"] / stats["total_s"] if stats["total_s"] else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch check/checkmate/stalemate/mobility analysis")
+    parser.add_argument("input", help="FEN/EPD file (one position per line) or .pgn file")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="output format (default: from extension, else jsonl)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="positions or games per task")
+    parser.add_argument("--max-inflight", type=int, default=None, help="queued chunks before the reader waits (default: 2x workers)")
+    args = parser.parse_args()
+
+    output_format = args.format or ("csv" if args.output and args.output.endswith(".csv") else "jsonl")
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        stats = run(args.input, out, output_format, args.workers, args.chunk_size, args.max_inflight)
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"{stats['positions']} positions ({stats['errors']} errors) in {stats['total_s']:.2f}s: "
+          f"{stats['positions_per_s']:.0f} positions/s", file=sys.stderr)
+    print(f"stages: read {stats['read_s']:.2f}s, analyze {stats['analyze_s']:.2f}s (summed over workers), "
+          f"waiting on workers {stats['wait_s']:.2f}s, write {stats['write_s']:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
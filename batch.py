@@ -0,0 +1,222 @@
+# NumPy batch backend: attack maps, check flags and mobility for many positions at once.
+#
+# A batch of N positions is an (N, 2, 6) uint64 array of bitboards indexed
+# [position, color, kind], using the same square layout as bitboard.py
+# (sq = row * 8 + col, row 0 = rank 8). Every operation below works on whole
+# bitboard columns, so the cost per position is a few dozen array ops shared
+# across the batch instead of a Python loop per square.
+#
+# NumPy is optional: the rest of the game never imports this module, and the
+# functions here raise ImportError when it is missing.
+#
+#   pieces, side = batch.encode(boards)              from models.Board objects
+#   pieces, side = batch.from_bytes(blobs)           from Board.to_bytes() blobs
+#   attacked = batch.attack_maps(pieces)             (N, 2) squares attacked per color
+#   checked = batch.in_check(pieces, attacked)       (N, 2) king attacked per color
+#   moves = batch.mobility(pieces)                   (N, 2) pseudo-legal move counts
+
+try:
+    import numpy as np
+except ImportError:  # The batch backend is optional
+    np = None
+
+from bitboard import BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+
+KNIGHT_STEPS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_STEPS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+STRAIGHT_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL_STEPS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+# Row step of a pawn push and the row pawns start on, indexed by color
+PAWN_DIRECTION = (-1, 1)
+PAWN_START_ROW = (6, 1)
+
+
+def _columns_mask(cols):
+    mask = 0
+    for row in range(8):
+        for col in cols:
+            mask |= 1 << (row * 8 + col)
+    return mask
+
+
+# Squares a piece may leave from when stepping dc columns without wrapping around the board
+_KEEP_COLUMNS = {dc: _columns_mask([c for c in range(8) if 0 <= c + dc < 8]) for dc in range(-2, 3)}
+_ROW_MASKS = [0xFF << (row * 8) for row in range(8)]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch.py needs NumPy (pip install numpy)")
+
+
+def _shift(bb, dr, dc):
+    # Moves every set bit by (dr, dc); bits that would leave the board are dropped
+    bb = bb & np.uint64(_KEEP_COLUMNS[dc])
+    n = dr * 8 + dc
+    return bb << np.uint64(n) if n > 0 else bb >> np.uint64(-n)
+
+
+def _slide(sliders, empty, dr, dc):
+    # Every square reached from sliders along (dr, dc), up to and including the first blocker
+    reached = np.zeros_like(sliders)
+    front = sliders
+    for _ in range(7):
+        front = _shift(front, dr, dc)
+        reached |= front
+        front &= empty
+    return reached
+
+
+def popcount(bb):
+    """ Set bits per element of a uint64 array """
+    _require_numpy()
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bb).astype(np.int64)
+    octets = np.ascontiguousarray(bb, dtype="<u8").view(np.uint8).reshape(bb.shape + (8,))
+    return np.unpackbits(octets, axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def encode(boards):
+    """ (N, 2, 6) uint64 bitboards and (N,) side to move (0 white, 1 black) for a list of Boards """
+    _require_numpy()
+    pieces = np.array([board.bitboards.pieces for board in boards], dtype=np.uint64).reshape(len(boards), 2, 6)
+    side = np.array([board.turn == "black" for board in boards], dtype=np.uint8)
+    return pieces, side
+
+
+def from_bytes(blobs):
+    """ Same as encode(), but straight from Board.to_bytes() blobs without building Boards """
+    _require_numpy()
+    data = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), 34)
+    # Square sq is the low nibble of byte sq // 2 for even sq, the high nibble for odd sq
+    codes = np.stack([data[:, :32] & 0xF, data[:, :32] >> 4], axis=-1).reshape(len(blobs), 64)
+    pieces = np.empty((len(blobs), 2, 6), dtype=np.uint64)
+    for color in (WHITE, BLACK):
+        for kind in range(6):
+            present = codes == kind + (1 if color == WHITE else 9)
+            pieces[:, color, kind] = np.packbits(present, axis=-1, bitorder="little").view("<u8")[:, 0]
+    return pieces, (data[:, 32] & 1).astype(np.uint8)
+
+
+def to_planes(pieces):
+    """ (N, 12, 8, 8) boolean planes, plane color * 6 + kind, [row][col] as in Board.board """
+    _require_numpy()
+    octets = np.ascontiguousarray(pieces, dtype="<u8").view(np.uint8).reshape(len(pieces), 12, 8)
+    return np.unpackbits(octets, axis=-1, bitorder="little").reshape(len(pieces), 12, 8, 8).astype(bool)
+
+
+def _occupancy(pieces):
+    occupied = np.bitwise_or.reduce(pieces, axis=2)
+    return occupied, occupied[:, WHITE] | occupied[:, BLACK]
+
+
+def attack_maps(pieces):
+    """ (N, 2) uint64: every square attacked by each color, like Bitboards.attacks() """
+    _require_numpy()
+    _, everything = _occupancy(pieces)
+    empty = ~everything
+    attacked = np.zeros(pieces.shape[:2], dtype=np.uint64)
+    for color in (WHITE, BLACK):
+        own = pieces[:, color]
+        result = np.zeros(len(pieces), dtype=np.uint64)
+        dr = PAWN_DIRECTION[color]
+        result |= _shift(own[:, PAWN], dr, -1) | _shift(own[:, PAWN], dr, 1)
+        for dr, dc in KNIGHT_STEPS:
+            result |= _shift(own[:, KNIGHT], dr, dc)
+        for dr, dc in KING_STEPS:
+            result |= _shift(own[:, KING], dr, dc)
+        straight = own[:, ROOK] | own[:, QUEEN]
+        for dr, dc in STRAIGHT_STEPS:
+            result |= _slide(straight, empty, dr, dc)
+        diagonal = own[:, BISHOP] | own[:, QUEEN]
+        for dr, dc in DIAGONAL_STEPS:
+            result |= _slide(diagonal, empty, dr, dc)
+        attacked[:, color] = result
+    return attacked
+
+
+def in_check(pieces, attacked=None):
+    """ (N, 2) bool: whether each color's king is attacked """
+    _require_numpy()
+    if attacked is None:
+        attacked = attack_maps(pieces)
+    checked = np.empty(pieces.shape[:2], dtype=bool)
+    checked[:, WHITE] = pieces[:, WHITE, KING] & attacked[:, BLACK] != 0
+    checked[:, BLACK] = pieces[:, BLACK, KING] & attacked[:, WHITE] != 0
+    return checked
+
+
+def mobility(pieces):
+    """ (N, 2) pseudo-legal move counts per color: checks, pins and castling are ignored """
+    _require_numpy()
+    occupied, everything = _occupancy(pieces)
+    empty = ~everything
+    counts = np.zeros(pieces.shape[:2], dtype=np.int64)
+    for color in (WHITE, BLACK):
+        own = pieces[:, color]
+        targets = ~occupied[:, color]
+        # A single step moves each piece to a different square, so counting the
+        # shifted set counts moves, not just distinct target squares. The same
+        # holds for one sliding direction, because rays along it never overlap.
+        total = np.zeros(len(pieces), dtype=np.int64)
+        for dr, dc in KNIGHT_STEPS:
+            total += popcount(_shift(own[:, KNIGHT], dr, dc) & targets)
+        for dr, dc in KING_STEPS:
+            total += popcount(_shift(own[:, KING], dr, dc) & targets)
+        straight = own[:, ROOK] | own[:, QUEEN]
+        diagonal = own[:, BISHOP] | own[:, QUEEN]
+        for dr, dc in STRAIGHT_STEPS:
+            total += popcount(_slide(straight, empty, dr, dc) & targets)
+        for dr, dc in DIAGONAL_STEPS:
+            total += popcount(_slide(diagonal, empty, dr, dc) & targets)
+
+        pawns = own[:, PAWN]
+        dr = PAWN_DIRECTION[color]
+        single = _shift(pawns, dr, 0) & empty
+        double = _shift(_shift(pawns & np.uint64(_ROW_MASKS[PAWN_START_ROW[color]]), dr, 0) & empty, dr, 0) & empty
+        total += popcount(single) + popcount(double)
+        for dc in (-1, 1):
+            total += popcount(_shift(pawns, dr, dc) & occupied[:, color ^ 1])
+        counts[:, color] = total
+    return counts
+
+
+def _reference(board):
+    # Attack maps, check flags and pseudo-legal move counts computed one square at a time through Board
+    attacked = []
+    checked = []
+    counts = []
+    for color in ("white", "black"):
+        mask = 0
+        for sq in range(64):
+            if board.is_square_attacked(sq >> 3, sq & 7, color):
+                mask |= 1 << sq
+        attacked.append(mask)
+        checked.append(board.is_in_check(color))
+        count = 0
+        for row in range(8):
+            for col in range(8):
+                piece = board.get_piece(row, col)
+                if piece and piece.color == color:
+                    count += sum(1 for _, end_col in piece.generate_moves(board, row, col) if piece.kind != KING or abs(end_col - col) != 2)
+        counts.append(count)
+    return attacked, checked, counts
+
+
+def validate(boards):
+    """ Checks the batch results square for square against models.Board; raises AssertionError on a mismatch """
+    pieces, _ = encode(boards)
+    attacked = attack_maps(pieces)
+    checked = in_check(pieces, attacked)
+    counts = mobility(pieces)
+    for i, board in enumerate(boards):
+        expected_attacked, expected_checked, expected_counts = _reference(board)
+        for color in (WHITE, BLACK):
+            got = int(attacked[i, color])
+            if got != expected_attacked[color]:
+                diff = got ^ expected_attacked[color]
+                raise AssertionError(f"Attack map for color {color} differs on squares {sorted(sq for sq in range(64) if diff >> sq & 1)} in {board.to_fen()}")
+            if bool(checked[i, color]) != expected_checked[color]:
+                raise AssertionError(f"Check flag for color {color} differs in {board.to_fen()}")
+            if int(counts[i, color]) != expected_counts[color]:
+                raise AssertionError(f"Mobility for color {color} is {int(counts[i, color])}, expected {expected_counts[color]} in {board.to_fen()}")
@@ -0,0 +1,353 @@
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import batch
+import engine
+import evaluation
+import perft
+from bitboard import popcount
+from models import FEN_LETTERS, Board
+
+
+def sample_positions(count, seed=0, max_plies=60):
+    """ Collects positions by playing random legal games from the starting position """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board()
+        for _ in range(rng.randint(0, max_plies)):
+            moves = board.get_all_possible_moves(board.turn)
+            if not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+            board.switch_turn()
+        positions.append(copy.deepcopy(board))
+    return positions
+
+
+def scattered_positions(count, seed=0):
+    """ Positions with kings and a random handful of pieces on random squares, for attack checks """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        placement = [None] * 64
+        squares = rng.sample(range(64), rng.randint(2, 24))
+        placement[squares[0]], placement[squares[1]] = "K", "k"
+        for sq in squares[2:]:
+            letter = rng.choice(FEN_LETTERS[:5])
+            placement[sq] = letter.upper() if rng.random() < 0.5 else letter
+        ranks = []
+        for row in range(8):
+            rank = ""
+            empty = 0
+            for letter in placement[row * 8:row * 8 + 8]:
+                if letter is None:
+                    empty += 1
+                    continue
+                rank += (str(empty) if empty else "") + letter
+                empty = 0
+            ranks.append(rank + (str(empty) if empty else ""))
+        positions.append(Board.from_fen(f"{'/'.join(ranks)} {rng.choice('wb')} - - 0 1"))
+    return positions
+
+
+def brute_force_moves(board, color):
+    # The original generator: probe all 64 targets per piece with is_valid_move
+    moves = []
+    for r_start, row in enumerate(board.board):
+        for c_start, piece in enumerate(row):
+            if piece and piece.color == color:
+                for r_end in range(8):
+                    for c_end in range(8):
+                        if piece.is_valid_move(board, r_start, c_start, r_end, c_end):
+                            original_destination_piece = board.board[r_end][c_end]
+                            board._set_square(r_end, c_end, piece)
+                            board._set_square(r_start, c_start, None)
+
+                            if not board.is_in_check(color):
+                                moves.append((board._coords_to_algebraic(r_start, c_start), board._coords_to_algebraic(r_end, c_end)))
+
+                            board._set_square(r_start, c_start, piece)
+                            board._set_square(r_end, c_end, original_destination_piece)
+    return moves
+
+
+def _time_per_position(func, positions, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in positions:
+            func(board, board.turn)
+    return (time.perf_counter() - start) / (repeat * len(positions))
+
+
+def bench_movegen(positions=50, repeat=3, seed=0):
+    boards = sample_positions(positions, seed)
+    for board in boards:
+        if sorted(brute_force_moves(board, board.turn)) != sorted(board.get_all_possible_moves(board.turn)):
+            raise AssertionError(f"Move generators disagree after {board.move_log}")
+
+    brute = _time_per_position(brute_force_moves, boards, repeat)
+    current = _time_per_position(Board.get_all_possible_moves, boards, repeat)
+    print(f"movegen: {len(boards)} positions x {repeat}")
+    print(f"  brute force 64-target probe: {brute * 1e6:10.1f} us/position")
+    print(f"  get_all_possible_moves:      {current * 1e6:10.1f} us/position")
+    print(f"  speedup:                     {brute / current:10.1f}x")
+
+
+def _count_attackers(board):
+    # Every square's attacker count for both colors, one reverse lookup per square
+    return [[popcount(board.bitboards.attackers_to(sq, side)) for sq in range(64)] for side in (0, 1)]
+
+
+def _cached_attacker_counts(board):
+    return [[board.attacker_count(sq >> 3, sq & 7, color) for sq in range(64)] for color in ("white", "black")]
+
+
+def bench_attacks(positions=200, repeat=5, seed=6):
+    boards = sample_positions(positions // 2, seed, max_plies=120) + scattered_positions(positions - positions // 2, seed)
+    for board in boards:
+        expected = _count_attackers(board)
+        if _cached_attacker_counts(board) != expected:
+            raise AssertionError(f"Attacker counts differ from attackers_to in {board.to_fen()}")
+        for side, color in enumerate(("white", "black")):
+            for sq in range(64):
+                if board.is_square_attacked(sq >> 3, sq & 7, color) != (expected[side][sq] > 0):
+                    raise AssertionError(f"Attack map and attacker counts disagree on square {sq} in {board.to_fen()}")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            _count_attackers(board)
+    looped = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            board._attack_cache = None
+            _cached_attacker_counts(board)
+    cached = time.perf_counter() - start
+    print(f"attacks: all 128 attacker counts for {len(boards)} positions x {repeat}, validated against attackers_to")
+    print(f"  attackers_to per square:     {looped / (repeat * len(boards)) * 1e6:10.1f} us/position")
+    print(f"  attacker_count (cold cache): {cached / (repeat * len(boards)) * 1e6:10.1f} us/position")
+    print(f"  speedup:                     {looped / cached:10.1f}x")
+
+
+def bench_search(positions=5, depth=3, seed=1):
+    boards = sample_positions(positions, seed)
+    nodes = 0
+    elapsed = 0.0
+    hits = probes = collisions = 0
+    for board in boards:
+        computer = engine.Engine()
+        result = computer.search(board, time_ms=10 ** 9, max_depth=depth)
+        nodes += result.nodes
+        elapsed += result.elapsed
+        hits += computer.tt.hits
+        probes += computer.tt.hits + computer.tt.misses
+        collisions += computer.tt.collisions
+    print(f"search: {len(boards)} positions to depth {depth}")
+    print(f"  nodes:                       {nodes:10d}")
+    print(f"  nodes/second:                {nodes / elapsed:10.0f}")
+    print(f"  hash hit rate:               {hits / probes if probes else 0:10.1%}")
+    print(f"  hash collisions:             {collisions:10d}")
+
+
+def bench_perft(depth=4):
+    board = Board.from_fen(perft.START_FEN)
+    start = time.perf_counter()
+    nodes = perft.perft(board, depth)
+    elapsed = time.perf_counter() - start
+    print(f"perft: start position to depth {depth}")
+    print(f"  nodes:                       {nodes:10d}")
+    print(f"  nodes/second:                {nodes / elapsed:10.0f}")
+
+
+def bench_codec(positions=200, repeat=5, seed=2):
+    boards = sample_positions(positions, seed)
+    fens = [board.to_fen() for board in boards]
+    blobs = [board.to_bytes() for board in boards]
+    for board, fen, blob in zip(boards, fens, blobs):
+        if Board.from_fen(fen).to_bytes() != blob or Board.from_bytes(blob).to_fen().split()[:4] != fen.split()[:4]:
+            raise AssertionError(f"Codec round trip failed for {fen}")
+        # The copies must also play the same moves, castling included
+        expected = sorted(board.generate_legal_moves(board.turn))
+        for copy_board in (Board.from_fen(fen), Board.from_bytes(blob)):
+            if sorted(copy_board.generate_legal_moves(copy_board.turn)) != expected:
+                raise AssertionError(f"Legal moves differ after a codec round trip for {fen}")
+
+    print(f"codec: {len(boards)} positions x {repeat}")
+    for label, func, items in (
+        ("Board.from_fen", Board.from_fen, fens),
+        ("Board.to_fen", Board.to_fen, boards),
+        ("Board.from_bytes", Board.from_bytes, blobs),
+        ("Board.to_bytes", Board.to_bytes, boards),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for item in items:
+                func(item)
+        elapsed = time.perf_counter() - start
+        print(f"  {label + ':':28s} {repeat * len(items) / elapsed:10.0f} positions/s")
+
+
+def bench_batch(positions=2000, seed=3):
+    if batch.np is None:
+        print("batch: skipped, NumPy is not installed")
+        return
+    boards = sample_positions(positions // 2, seed, max_plies=120) + scattered_positions(positions - positions // 2, seed)
+    batch.validate(boards)
+
+    start = time.perf_counter()
+    for board in boards:
+        batch._reference(board)
+    looped = time.perf_counter() - start
+
+    blobs = [board.to_bytes() for board in boards]
+    start = time.perf_counter()
+    pieces, _ = batch.from_bytes(blobs)
+    attacked = batch.attack_maps(pieces)
+    batch.in_check(pieces, attacked)
+    batch.mobility(pieces)
+    vectorized = time.perf_counter() - start
+    print(f"batch: attack maps, check flags and mobility for {len(boards)} positions, validated against Board")
+    print(f"  one Board at a time:         {len(boards) / looped:10.0f} positions/s")
+    print(f"  NumPy batch (from bytes):    {len(boards) / vectorized:10.0f} positions/s")
+    print(f"  speedup:                     {looped / vectorized:10.1f}x")
+
+
+def _piece_size(piece):
+    # The object itself plus its instance dict, if the class has one
+    size = sys.getsizeof(piece)
+    if hasattr(piece, "__dict__"):
+        size += sys.getsizeof(piece.__dict__)
+    return size
+
+
+def bench_eval(positions=200, repeat=20, seed=4):
+    boards = sample_positions(positions, seed)
+    for board in boards:
+        evaluation.verify(board)
+
+    print(f"eval: {len(boards)} positions x {repeat}")
+    for label, func in (
+        ("evaluation.evaluate", evaluation.evaluate),
+        ("material + PST, incremental", lambda board: board.piece_square_score[0] - board.piece_square_score[1]),
+        ("material + PST, from scratch", lambda board: evaluation.compute_piece_square_score(board, 0) - evaluation.compute_piece_square_score(board, 1)),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for board in boards:
+                func(board)
+        elapsed = time.perf_counter() - start
+        print(f"  {label + ':':28s} {repeat * len(boards) / elapsed:10.0f} evals/s")
+
+
+def bench_memory(boards=200):
+    # Everything a fresh Board allocates: the 8x8 array, pieces, bitboards and lists
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [Board() for _ in range(boards)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    board = kept[0]
+    start = time.perf_counter()
+    for _ in range(1000):
+        board.get_all_possible_moves(board.turn)
+    elapsed = time.perf_counter() - start
+    print(f"memory: {boards} boards in the starting position")
+    print(f"  bytes per board:             {used / boards:10.0f}")
+    print(f"  bytes per piece object:      {_piece_size(board.board[0][0]):10d}")
+    print(f"  get_all_possible_moves:      {elapsed * 1e3:10.1f} us/call")
+
+
+def bench_render(frames=200, seed=5):
+    try:
+        import pygame
+    except ImportError:
+        print("render: skipped, pygame is not installed")
+        return
+    from gui import GUI
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # No window needed to time the drawing
+    pygame.init()
+    gui = GUI(None, "medium")
+    gui.screen = pygame.display.set_mode((gui.WIDTH, gui.HEIGHT))
+    print(f"render: GUI.update_display, {frames} frames per case")
+    for dirty_rendering in (False, True):
+        gui.dirty_rendering = dirty_rendering
+        gui.invalidate()
+        label = "dirty rects" if dirty_rendering else "full redraw"
+
+        board = Board()
+        gui.update_display(board)
+        gui.reset_frame_stats()
+        for _ in range(frames):
+            gui.update_display(board)
+        idle = gui.frame_stats()["average_ms"]
+
+        # A random game with a piece selected on every other frame and a move every fourth
+        rng = random.Random(seed)
+        gui.reset_frame_stats()
+        selected, targets = None, []
+        for frame in range(frames):
+            index = board.legal_move_index(board.turn)
+            if not index:
+                board = Board()
+                continue
+            if frame % 4 == 3 and selected:
+                board.move_piece(board._coords_to_algebraic(*selected), board._coords_to_algebraic(*rng.choice(targets)))
+                board.switch_turn()
+                selected, targets = None, []
+            elif frame % 2:
+                selected = rng.choice(list(index))
+                targets = index[selected]
+            gui.update_display(board, selected, targets, None, board.is_in_check(board.turn), None, (frame % 8, frame // 8 % 8))
+        play = gui.frame_stats()["average_ms"]
+
+        # A 500-move history, scrolled one row per frame; only the rows in view are drawn
+        board = Board()
+        board.move_log = [["g1f3", "g8f6"], ["f3g1", "f6g8"]] * 250
+        gui.reset_frame_stats()
+        for frame in range(frames):
+            gui.scroll_move_list(-1 if frame % 40 < 20 else 1, len(board.move_log))
+            gui.update_display(board)
+        history = gui.frame_stats()["average_ms"]
+        print(f"  {label + ', idle:':28s} {idle:10.3f} ms/frame")
+        print(f"  {label + ', during play:':28s} {play:10.3f} ms/frame")
+        print(f"  {label + ', 500 moves:':28s} {history:10.3f} ms/frame")
+    pygame.quit()
+
+
+BENCHMARKS = {
+    "attacks": bench_attacks,
+    "batch": bench_batch,
+    "codec": bench_codec,
+    "eval": bench_eval,
+    "memory": bench_memory,
+    "movegen": bench_movegen,
+    "perft": bench_perft,
+    "render": bench_render,
+    "search": bench_search,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chess performance benchmarks")
+    parser.add_argument("benchmark", nargs="*", help=f"benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmark if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    for name in args.benchmark or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Bitboard position core used by models.Board for attack and king queries.
+#
+# Squares are indexed as sq = row * 8 + col, with row 0 being rank 8, which is
+# the same layout as Board.board. Bit n of a bitboard is square n.
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+WHITE, BLACK = 0, 1
+COLOR_INDEX = {"white": WHITE, "black": BLACK}
+
+FULL = (1 << 64) - 1
+
+
+def _square(row, col):
+    # Only for building the tables; Board keeps row * 8 + col inline on its hot paths
+    return row * 8 + col
+
+
+def bit_scan(bb):
+    """ Index of the least significant set bit """
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_bits(bb):
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+if hasattr(int, "bit_count"):  # Python 3.10+
+    popcount = int.bit_count
+else:
+    def popcount(bb):
+        return bin(bb).count("1")
+
+
+def _offset_table(offsets):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << _square(r, c)
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _offset_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _offset_table([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# White pawns move towards row 0, black pawns towards row 7
+PAWN_ATTACKS = [
+    _offset_table([(-1, -1), (-1, 1)]),
+    _offset_table([(1, -1), (1, 1)]),
+]
+
+# Sliding directions as (row step, col step)
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+# A direction is "positive" if walking along it increases the square index,
+# so the nearest blocker on the ray is its lowest set bit.
+POSITIVE = [dr * 8 + dc > 0 for dr, dc in DIRECTIONS]
+
+
+def _ray_table(dr, dc):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            mask |= 1 << _square(r, c)
+            r += dr
+            c += dc
+        table.append(mask)
+    return table
+
+
+RAYS = [_ray_table(dr, dc) for dr, dc in DIRECTIONS]
+
+
+def _between_table():
+    # BETWEEN[a][b] holds the squares strictly between a and b when they share a line
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        for dr, dc in DIRECTIONS:
+            mask = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                target = _square(r, c)
+                table[sq][target] = mask
+                mask |= 1 << target
+                r += dr
+                c += dc
+    return table
+
+
+BETWEEN = _between_table()
+
+
+def _slider_attacks(sq, occupied, directions):
+    attacks = 0
+    for d in directions:
+        ray = RAYS[d][sq]
+        blockers = ray & occupied
+        if blockers:
+            if POSITIVE[d]:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[d][blocker]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, ROOK_DIRECTIONS)
+
+
+def bishop_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, BISHOP_DIRECTIONS)
+
+
+def queen_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, ROOK_DIRECTIONS) | _slider_attacks(sq, occupied, BISHOP_DIRECTIONS)
+
+
+def piece_attacks(kind, color, sq, occupied):
+    if kind == PAWN:
+        return PAWN_ATTACKS[color][sq]
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if kind == BISHOP:
+        return bishop_attacks(sq, occupied)
+    if kind == ROOK:
+        return rook_attacks(sq, occupied)
+    if kind == QUEEN:
+        return queen_attacks(sq, occupied)
+    return KING_ATTACKS[sq]
+
+
+class Bitboards:
+    """ Occupancy bitboards per color and piece kind """
+
+    def __init__(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+
+    @property
+    def all(self):
+        return self.occupied[WHITE] | self.occupied[BLACK]
+
+    def add(self, sq, color, kind):
+        bit = 1 << sq
+        self.pieces[color][kind] |= bit
+        self.occupied[color] |= bit
+
+    def remove(self, sq, color, kind):
+        mask = ~(1 << sq)
+        self.pieces[color][kind] &= mask
+        self.occupied[color] &= mask
+
+    def attackers_to(self, sq, by_color, occupied=None):
+        """ Bitboard of by_color pieces attacking sq, with an optional occupancy override """
+        if occupied is None:
+            occupied = self.all
+        p = self.pieces[by_color]
+        # A pawn of by_color attacks sq iff a pawn of the other color on sq would attack it
+        attackers = PAWN_ATTACKS[by_color ^ 1][sq] & p[PAWN]
+        attackers |= KNIGHT_ATTACKS[sq] & p[KNIGHT]
+        attackers |= KING_ATTACKS[sq] & p[KING]
+        diagonal = p[BISHOP] | p[QUEEN]
+        if diagonal:
+            attackers |= bishop_attacks(sq, occupied) & diagonal
+        straight = p[ROOK] | p[QUEEN]
+        if straight:
+            attackers |= rook_attacks(sq, occupied) & straight
+        return attackers
+
+    def is_attacked(self, sq, by_color, occupied=None):
+        if occupied is None:
+            occupied = self.all
+        p = self.pieces[by_color]
+        if PAWN_ATTACKS[by_color ^ 1][sq] & p[PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & p[KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & p[KING]:
+            return True
+        diagonal = p[BISHOP] | p[QUEEN]
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        straight = p[ROOK] | p[QUEEN]
+        if straight and rook_attacks(sq, occupied) & straight:
+            return True
+        return False
+
+    def pinned(self, king_sq, color):
+        """ Maps each absolutely pinned piece of color to the squares it may still move to """
+        enemy = self.pieces[color ^ 1]
+        own = self.occupied[color]
+        occupied = self.all
+        snipers = rook_attacks(king_sq, 0) & (enemy[ROOK] | enemy[QUEEN])
+        snipers |= bishop_attacks(king_sq, 0) & (enemy[BISHOP] | enemy[QUEEN])
+        pins = {}
+        for sniper in iter_bits(snipers):
+            blockers = BETWEEN[king_sq][sniper] & occupied
+            # Exactly one piece in between, and it is ours
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pins[bit_scan(blockers)] = BETWEEN[king_sq][sniper] | (1 << sniper)
+        return pins
+
+    def attacks(self, color):
+        """ Union of all squares attacked by color """
+        occupied = self.all
+        result = 0
+        for kind, bb in enumerate(self.pieces[color]):
+            for sq in iter_bits(bb):
+                result |= piece_attacks(kind, color, sq, occupied)
+        return result
+
+    def attack_counts(self, color):
+        """ Number of color pieces attacking each of the 64 squares """
+        occupied = self.all
+        counts = [0] * 64
+        for kind, bb in enumerate(self.pieces[color]):
+            for sq in iter_bits(bb):
+                for target in iter_bits(piece_attacks(kind, color, sq, occupied)):
+                    counts[target] += 1
+        return counts
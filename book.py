@@ -0,0 +1,199 @@
+# Opening book in a Polyglot-style binary file, memory-mapped for lookups.
+#
+# The file is a sorted array of 16-byte big-endian entries:
+#   key    : 8 bytes  Board.zobrist_key of the position
+#   move   : 2 bytes  to_file | to_rank << 3 | from_file << 6 | from_rank << 9
+#   weight : 2 bytes  relative frequency of the move in that position
+#   learn  : 4 bytes  unused, kept 0
+# Files and ranks count from a1 as in Polyglot, and castling is stored as
+# the king capturing its own rook (e1h1 for O-O). The keys are this
+# project's Zobrist keys, not the Polyglot Random64 ones, so books built
+# elsewhere cannot be read; build them from PGN with this module.
+#
+# OpeningBook maps the file and binary-searches it, so opening a book costs
+# the same whatever its size and nothing is loaded into Python objects.
+#
+#   python book.py build games.pgn -o book.bin --plies 20
+#   python book.py probe book.bin --fen "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+import time
+
+import pgn
+from bitboard import KING
+from models import START_FEN, Board
+
+ENTRY = struct.Struct(">QHHI")
+ENTRY_BYTES = ENTRY.size
+_KEY = struct.Struct(">Q")
+MAX_WEIGHT = 0xFFFF
+
+
+def encode_move(start_row, start_col, end_row, end_col):
+    """ Polyglot move bits for a move in Board coordinates (row 0 is rank 8) """
+    return end_col | (7 - end_row) << 3 | start_col << 6 | (7 - start_row) << 9
+
+
+def decode_move(code):
+    """ (start_row, start_col, end_row, end_col) for Polyglot move bits """
+    return 7 - (code >> 9 & 7), code >> 6 & 7, 7 - (code >> 3 & 7), code & 7
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = self._file.seek(0, 2)
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.entries = size // ENTRY_BYTES
+
+    def close(self):
+        if self._map:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _key_at(self, index):
+        return _KEY.unpack_from(self._map, index * ENTRY_BYTES)[0]
+
+    def lookup(self, key):
+        """ [(move code, weight)] stored for key, in file order """
+        # Lower bound: first entry whose key is >= key
+        low, high = 0, self.entries
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        index = low
+        while index < self.entries:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self._map, index * ENTRY_BYTES)
+            if entry_key != key:
+                break
+            moves.append((move, weight))
+            index += 1
+        return moves
+
+    def moves(self, board):
+        """ [((start, end), weight)] book moves for the side to move that are legal on board, in algebraic squares """
+        legal = set(board.generate_legal_moves(board.turn))
+        result = []
+        for code, weight in self.lookup(board.zobrist_key):
+            start_row, start_col, end_row, end_col = decode_move(code)
+            piece = board.get_piece(start_row, start_col)
+            # Castling is stored as king takes own rook
+            if piece and piece.kind == KING and start_col == 4 and start_row == end_row and end_col in (0, 7):
+                end_col = 6 if end_col == 7 else 2
+            move = (start_row, start_col, end_row, end_col)
+            if move in legal:
+                result.append(((board._coords_to_algebraic(start_row, start_col), board._coords_to_algebraic(end_row, end_col)), weight))
+        return result
+
+    def choose(self, board, rng=random):
+        """ A book move for board picked with probability proportional to its weight, or None """
+        candidates = [(move, weight) for move, weight in self.moves(board) if weight > 0]
+        if not candidates:
+            return None
+        pick = rng.uniform(0, sum(weight for _, weight in candidates))
+        for move, weight in candidates:
+            pick -= weight
+            if pick <= 0:
+                return move
+        return candidates[-1][0]
+
+
+def _book_move_code(board, start, end):
+    start_row, start_col = board._algebraic_to_coords(start)
+    end_row, end_col = board._algebraic_to_coords(end)
+    if board.get_piece(start_row, start_col).kind == KING and abs(end_col - start_col) == 2:
+        end_col = 7 if end_col == 6 else 0
+    return encode_move(start_row, start_col, end_row, end_col)
+
+
+def build(pgn_paths, out_path, max_plies=20, min_weight=1):
+    """ Writes a book from PGN games and returns (games, positions, entries) """
+    # (key, move) -> weight: 2 per win and 1 per draw or unfinished game for the side that played it
+    weights = {}
+    games = 0
+    for path in pgn_paths:
+        with open(path, encoding="utf-8", errors="replace") as stream:
+            for game in pgn.read_games(stream):
+                games += 1
+                try:
+                    board = Board.from_fen(game.headers["FEN"]) if "FEN" in game.headers else Board()
+                except ValueError:
+                    continue
+                for san in game.moves[:max_plies]:
+                    try:
+                        start, end = pgn.san_to_move(board, san)
+                    except pgn.PGNError:
+                        break
+                    won = game.result == ("1-0" if board.turn == "white" else "0-1")
+                    lost = game.result == ("0-1" if board.turn == "white" else "1-0")
+                    # Keyed on the position before the move, recorded only once it is played
+                    entry = (board.zobrist_key, _book_move_code(board, start, end))
+                    if not board.move_piece(start, end):
+                        break
+                    board.switch_turn()
+                    if not lost:
+                        weights[entry] = weights.get(entry, 0) + (2 if won else 1)
+
+    # Scale each position's weights down if its best move would overflow 16 bits
+    best = {}
+    for (key, _), weight in weights.items():
+        best[key] = max(best.get(key, 0), weight)
+    entries = 0
+    with open(out_path, "wb") as out:
+        for (key, move), weight in sorted(weights.items()):
+            if best[key] > MAX_WEIGHT:
+                weight = weight * MAX_WEIGHT // best[key]
+            if weight >= min_weight:
+                out.write(ENTRY.pack(key, move, weight, 0))
+                entries += 1
+    return games, len(best), entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and probe opening books")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    build_parser = subparsers.add_parser("build", help="build a book from PGN files")
+    build_parser.add_argument("pgn", nargs="+")
+    build_parser.add_argument("-o", "--output", required=True)
+    build_parser.add_argument("--plies", type=int, default=20, help="moves per game to include")
+    build_parser.add_argument("--min-weight", type=int, default=1, help="drop moves weighted below this")
+    probe_parser = subparsers.add_parser("probe", help="list the book moves for a position")
+    probe_parser.add_argument("book")
+    probe_parser.add_argument("--fen", default=START_FEN)
+    args = parser.parse_args()
+
+    if args.mode == "build":
+        start = time.perf_counter()
+        games, positions, entries = build(args.pgn, args.output, args.plies, args.min_weight)
+        print(f"{games} games, {positions} positions, {entries} entries in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    board = Board.from_fen(args.fen)
+    with OpeningBook(args.book) as opening_book:
+        start = time.perf_counter()
+        moves = opening_book.moves(board)
+        elapsed = time.perf_counter() - start
+        total = sum(weight for _, weight in moves)
+        for (move_start, move_end), weight in sorted(moves, key=lambda item: -item[1]):
+            print(f"{move_start}{move_end}: weight {weight} ({weight / total if total else 0:.1%})")
+        print(f"{len(moves)} moves from {opening_book.entries} entries in {elapsed * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# Computer opponent: negamax alpha-beta search with iterative deepening.
+#
+# The search plays moves directly on the Board it is given with
+# make_move/unmake_move, so the board is left exactly as it was found.
+
+import threading
+import time
+from collections import namedtuple
+
+from evaluation import PIECE_VALUES, evaluate
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+MATE_SCORE = 100000
+INFINITY = MATE_SCORE + 1
+MAX_PLY = 64
+
+# Nodes between clock checks; at 10-20k nodes/s this keeps overruns to a few ms
+CHECK_INTERVAL = 64
+
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'nodes', 'elapsed', 'nps'])
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def _score_to_tt(score, ply):
+    # Mate scores are stored relative to the node, not the root
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score + ply
+    return score
+
+
+class Engine:
+    def __init__(self, hash_mb=16, book=None, tablebase=None):
+        self.tt = TranspositionTable(hash_mb)
+        self.book = book  # Optional book.OpeningBook consulted before searching
+        self.tablebase = tablebase  # Optional tablebase.Tablebase giving exact scores in covered endgames
+        # Set from another thread to end the current search early, like running out of time
+        self.stop_event = threading.Event()
+        self.nodes = 0
+        self.deadline = None
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 64 for _ in range(64)]
+
+    def search(self, board, time_ms, max_depth=MAX_PLY):
+        start = time.perf_counter()
+        if self.book:
+            move = self.book.choose(board)
+            if move:
+                # Book moves are reported with depth 0 and no nodes searched
+                return SearchResult(move, 0, 0, 0, time.perf_counter() - start, 0.0)
+        self.deadline = start + time_ms / 1000
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.tt.new_search()
+        self.tt.reset_counters()
+
+        best_move, best_score, completed_depth = None, 0, 0
+        root_moves = list(board.generate_legal_moves(board.turn))
+        if root_moves:
+            # If not even depth 1 finishes, play the hash move or the best capture rather than
+            # whichever move was generated first
+            entry = self.tt.probe(board.zobrist_key)
+            self._order_moves(board, root_moves, 0, entry[3] if entry else None)
+            best_move = root_moves[0]
+
+        for depth in range(1, max_depth + 1):
+            if not root_moves:
+                break
+            try:
+                score, move = self._search_root(board, root_moves, depth, best_move)
+            except SearchTimeout:
+                break
+            best_move, best_score, completed_depth = move, score, depth
+            # A forced mate will not change with more depth
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break
+            # The next iteration costs several times this one, so don't start what we can't finish
+            if (time.perf_counter() - start) * 2 > time_ms / 1000:
+                break
+
+        elapsed = time.perf_counter() - start
+        if best_move:
+            best_move = (board._coords_to_algebraic(best_move[0], best_move[1]), board._coords_to_algebraic(best_move[2], best_move[3]))
+        return SearchResult(best_move, best_score, completed_depth, self.nodes, elapsed, self.nodes / elapsed if elapsed else 0.0)
+
+    def _search_root(self, board, moves, depth, pv_move):
+        self._order_moves(board, moves, 0, pv_move)
+        alpha, beta = -INFINITY, INFINITY
+        best_move = None
+        for move in moves:
+            score = -self._negamax_after(board, move, depth - 1, -beta, -alpha, 1)
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = move
+        self.tt.store(board.zobrist_key, depth, EXACT, _score_to_tt(alpha, 0), best_move)
+        return alpha, best_move
+
+    def _negamax_after(self, board, move, depth, alpha, beta, ply):
+        record = board.make_move(*move)
+        board.switch_turn()
+        try:
+            return self._negamax(board, depth, alpha, beta, ply)
+        finally:
+            board.switch_turn()
+            board.unmake_move(record)
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and (time.perf_counter() >= self.deadline or self.stop_event.is_set()):
+            raise SearchTimeout()
+
+    def _probe_tablebase(self, board, ply):
+        # Exact score of a covered endgame, with mates scored like the search scores them
+        result = self.tablebase.probe(board)
+        if result is None:
+            return None
+        outcome, plies = result
+        if outcome > 0:
+            return MATE_SCORE - ply - plies
+        if outcome < 0:
+            return -MATE_SCORE + ply + plies
+        return 0
+
+    def _negamax(self, board, depth, alpha, beta, ply):
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(board, alpha, beta, ply)
+        self._tick()
+        if self.tablebase:
+            score = self._probe_tablebase(board, ply)
+            if score is not None:
+                return score
+
+        key = board.zobrist_key
+        hash_move = None
+        entry = self.tt.probe(key)
+        if entry:
+            entry_depth, bound, entry_score, hash_move = entry
+            if entry_depth >= depth:
+                entry_score = _score_from_tt(entry_score, ply)
+                if bound == EXACT or (bound == LOWER and entry_score >= beta) or (bound == UPPER and entry_score <= alpha):
+                    return entry_score
+
+        moves = list(board.generate_legal_moves(board.turn))
+        if not moves:
+            return -MATE_SCORE + ply if board.is_in_check(board.turn) else 0
+
+        self._order_moves(board, moves, ply, hash_move)
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in moves:
+            score = -self._negamax_after(board, move, depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if board.board[move[2]][move[3]] is None:
+                    self._store_killer(move, ply)
+                    self.history[move[0] * 8 + move[1]][move[2] * 8 + move[3]] += depth * depth
+                break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, bound, _score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def _quiesce(self, board, alpha, beta, ply):
+        self._tick()
+        if self.tablebase:
+            score = self._probe_tablebase(board, ply)
+            if score is not None:
+                return score
+        stand_pat = evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = [move for move in board.generate_legal_moves(board.turn) if board.board[move[2]][move[3]] is not None]
+        self._order_moves(board, captures, ply, None)
+        for move in captures:
+            score = -self._quiesce_after(board, move, -beta, -alpha, ply + 1)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _quiesce_after(self, board, move, alpha, beta, ply):
+        record = board.make_move(*move)
+        board.switch_turn()
+        try:
+            return self._quiesce(board, alpha, beta, ply)
+        finally:
+            board.switch_turn()
+            board.unmake_move(record)
+
+    def _store_killer(self, move, ply):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+    def _order_moves(self, board, moves, ply, pv_move):
+        killers = self.killers[min(ply, MAX_PLY)]
+        history = self.history
+        squares = board.board
+
+        def score(move):
+            if move == pv_move:
+                return 10000000
+            victim = squares[move[2]][move[3]]
+            if victim is not None:
+                # MVV-LVA: most valuable victim first, least valuable attacker as tie-break
+                attacker = squares[move[0]][move[1]]
+                return 1000000 + 10 * PIECE_VALUES[victim.kind] - PIECE_VALUES[attacker.kind]
+            if move == killers[0]:
+                return 900000
+            if move == killers[1]:
+                return 800000
+            return history[move[0] * 8 + move[1]][move[2] * 8 + move[3]]
+
+        moves.sort(key=score, reverse=True)
+
+
+_default_engine = None
+
+
+def best_move(board, time_ms):
+    """ Searches the position for up to time_ms milliseconds and returns a SearchResult """
+    global _default_engine
+    # Reuse one engine so its transposition table carries over between moves
+    if _default_engine is None:
+        _default_engine = Engine()
+    return _default_engine.search(board, time_ms)
@@ -0,0 +1,196 @@
+# Static evaluation: material, piece-square tables, mobility and king safety.
+#
+# Material and piece-square terms are kept incrementally by Board: every
+# square change in Board._set_square adds or removes the piece's entry from
+# PIECE_SQUARE_VALUES, so evaluate() reads them in O(1). Mobility and king
+# safety depend on the whole position and are computed from the bitboards
+# when evaluating.
+#
+# All scores are in centipawns. evaluate() is from the point of view of the
+# side to move; breakdown() reports each term for white and black.
+
+from bitboard import (
+    BISHOP, BLACK, KING, KING_ATTACKS, KNIGHT, KNIGHT_ATTACKS, PAWN, QUEEN, ROOK, WHITE,
+    COLOR_INDEX, bishop_attacks, iter_bits, popcount, queen_attacks, rook_attacks,
+)
+
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900, KING: 0}
+
+# Piece-square tables from white's point of view, laid out like Board.board
+# (first row is rank 8). Black uses the table mirrored vertically.
+# Pawns cannot promote in this game, so the last two ranks are not rewarded:
+# a pawn on rank 8 is stuck there for good.
+_PAWN_TABLE = [
+    -40, -40, -40, -40, -40, -40, -40, -40,
+     20,  20,  20,  20,  20,  20,  20,  20,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+_KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK_TABLE = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+]
+_QUEEN_TABLE = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+_KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+]
+PIECE_SQUARE_TABLES = [_PAWN_TABLE, _KNIGHT_TABLE, _BISHOP_TABLE, _ROOK_TABLE, _QUEEN_TABLE, _KING_TABLE]
+
+# PIECE_SQUARE_VALUES[color][kind][sq]: material plus table bonus, from color's own point of view
+PIECE_SQUARE_VALUES = [
+    [[PIECE_VALUES[kind] + table[sq] for sq in range(64)] for kind, table in enumerate(PIECE_SQUARE_TABLES)],
+    [[PIECE_VALUES[kind] + table[sq ^ 56] for sq in range(64)] for kind, table in enumerate(PIECE_SQUARE_TABLES)],
+]
+
+# Centipawns per square a piece attacks that is not occupied by its own side
+MOBILITY_WEIGHTS = {KNIGHT: 4, BISHOP: 5, ROOK: 2, QUEEN: 1}
+# King safety only matters while the enemy still has a queen
+SHIELD_BONUS = 10  # per own pawn on the three squares in front of the king
+ZONE_ATTACK_PENALTY = 8  # per enemy piece attack on the king or the squares around it
+
+
+def _shield_masks(forward):
+    # The (up to) three squares directly in front of a king on each square
+    masks = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        if 0 <= row + forward < 8:
+            for c in range(max(0, col - 1), min(8, col + 2)):
+                mask |= 1 << ((row + forward) * 8 + c)
+        masks.append(mask)
+    return masks
+
+
+# SHIELD_MASKS[color][king square]; white pawns advance towards row 0
+SHIELD_MASKS = [_shield_masks(-1), _shield_masks(1)]
+
+
+def compute_piece_square_score(board, side):
+    """ Material plus piece-square score of side, computed from scratch """
+    pieces = board.bitboards.pieces[side]
+    return sum(PIECE_SQUARE_VALUES[side][kind][sq] for kind in range(6) for sq in iter_bits(pieces[kind]))
+
+
+def material(board, side):
+    pieces = board.bitboards.pieces[side]
+    return sum(value * popcount(pieces[kind]) for kind, value in PIECE_VALUES.items())
+
+
+def activity(board, side):
+    """ (mobility score, attacks on the enemy king zone) for the knights, bishops, rooks and queens of side """
+    bitboards = board.bitboards
+    occupied = bitboards.all
+    not_own = ~bitboards.occupied[side]
+    enemy_king = board.king_squares[side ^ 1]
+    zone = KING_ATTACKS[enemy_king] | 1 << enemy_king if enemy_king is not None else 0
+    pieces = bitboards.pieces[side]
+    score = zone_attacks = 0
+    # One pass over the pieces feeds both terms
+    for kind, weight in MOBILITY_WEIGHTS.items():
+        for sq in iter_bits(pieces[kind]):
+            if kind == KNIGHT:
+                attacks = KNIGHT_ATTACKS[sq]
+            elif kind == BISHOP:
+                attacks = bishop_attacks(sq, occupied)
+            elif kind == ROOK:
+                attacks = rook_attacks(sq, occupied)
+            else:
+                attacks = queen_attacks(sq, occupied)
+            score += weight * popcount(attacks & not_own)
+            if attacks & zone:
+                zone_attacks += popcount(attacks & zone)
+    return score, zone_attacks
+
+
+def king_safety(board, side, enemy_zone_attacks):
+    """ Pawn shield bonus minus a penalty per enemy attack on the squares around the king """
+    bitboards = board.bitboards
+    king_sq = board.king_squares[side]
+    if king_sq is None or not bitboards.pieces[side ^ 1][QUEEN]:
+        return 0
+    shield = popcount(bitboards.pieces[side][PAWN] & SHIELD_MASKS[side][king_sq])
+    return SHIELD_BONUS * shield - ZONE_ATTACK_PENALTY * enemy_zone_attacks
+
+
+def evaluate(board):
+    """ Score of the position from the point of view of the side to move """
+    side = COLOR_INDEX[board.turn]
+    enemy = side ^ 1
+    mobility, zone_attacks = activity(board, side)
+    enemy_mobility, enemy_zone_attacks = activity(board, enemy)
+    score = board.piece_square_score[side] - board.piece_square_score[enemy] + mobility - enemy_mobility
+    score += king_safety(board, side, enemy_zone_attacks) - king_safety(board, enemy, zone_attacks)
+    return score
+
+
+def breakdown(board):
+    """ Every evaluation term for white and black, plus the white-minus-black total, for debugging """
+    activities = [activity(board, WHITE), activity(board, BLACK)]
+    terms = {}
+    for name, side in COLOR_INDEX.items():
+        mat = material(board, side)
+        terms[name] = {
+            "material": mat,
+            "piece_square": board.piece_square_score[side] - mat,
+            "mobility": activities[side][0],
+            "king_safety": king_safety(board, side, activities[side ^ 1][1]),
+        }
+        terms[name]["total"] = sum(terms[name].values())
+    terms["total"] = terms["white"]["total"] - terms["black"]["total"]
+    return terms
+
+
+def verify(board):
+    """ Raises AssertionError if the incremental material/piece-square scores have drifted """
+    for name, side in COLOR_INDEX.items():
+        expected = compute_piece_square_score(board, side)
+        actual = board.piece_square_score[side]
+        if actual != expected:
+            raise AssertionError(f"Incremental piece-square score for {name} is {actual}, expected {expected}")
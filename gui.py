@@ -1,3 +1,6 @@
+import time
+from collections import OrderedDict
+
 import pygame
 
 # --- Colors ---
@@ -27,11 +30,27 @@ SIZE_PRESETS = {
     },
 }
 
+# --- Move history list ---
+MOVE_LIST_TOP = 130 # y of the first move row
+MOVE_ROW_HEIGHT = 25
+TEXT_CACHE_SIZE = 512 # Rendered strings kept by GUI.render_text
+
 class GUI:
     def __init__(self, screen, size="medium"):
         self.screen = screen
         self.piece_images = {}
         self.captured_piece_images = {}
+        # Size preset -> window-sized surface with everything that never changes at that size
+        self.backgrounds = {}
+        # (text, font, color) -> rendered surface, least recently used first
+        self.text_cache = OrderedDict()
+        # First move row shown in the history, or None to follow the latest move
+        self.move_list_scroll = None
+        # FPS and frame-time readout drawn in the corner of the left panel, None to hide it
+        self.fps_text = None
+        # False redraws the whole window every frame (the old behaviour, for comparison)
+        self.dirty_rendering = True
+        self.reset_frame_stats()
         pygame.font.init()
         self.setup_dimensions(size)
 
@@ -61,7 +80,34 @@ class GUI:
         self.medium_button_rect = pygame.Rect(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 50, button_y, button_size, button_size)
         self.large_button_rect = pygame.Rect(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 90, button_y, button_size, button_size)
         
+        self.left_panel_rect = pygame.Rect(0, 0, self.LEFT_PANEL_WIDTH, self.HEIGHT)
+        self.right_panel_rect = pygame.Rect(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH, 0, self.RIGHT_PANEL_WIDTH, self.HEIGHT)
+        self.board_rect = pygame.Rect(self.LEFT_PANEL_WIDTH, 0, self.BOARD_WIDTH, self.HEIGHT)
+        # Dims the board once the game is over; made once since it is blitted region by region
+        self.game_over_overlay = pygame.Surface((self.BOARD_WIDTH, self.HEIGHT), pygame.SRCALPHA)
+        self.game_over_overlay.fill((0, 0, 0, 128))
+
         self._load_piece_images()
+        if size not in self.backgrounds:
+            self.backgrounds[size] = self._render_background()
+        self.background = self.backgrounds[size]
+        self.invalidate()
+
+    def invalidate(self):
+        """ Makes the next update_display redraw the whole window (after a resize or when the window was exposed) """
+        # Region name -> state it was last drawn with; an empty dict means nothing is on screen yet
+        self._drawn = {}
+
+    def reset_frame_stats(self):
+        self.frame_count = 0
+        self.frame_time_total = 0.0
+        self.last_frame_ms = 0.0
+        self.last_dirty_rects = 0
+
+    def frame_stats(self):
+        """ Frames drawn, average and last update_display time in ms, and rects pushed by the last frame """
+        average = self.frame_time_total / self.frame_count * 1000 if self.frame_count else 0.0
+        return {"frames": self.frame_count, "average_ms": average, "last_ms": self.last_frame_ms, "dirty_rects": self.last_dirty_rects}
 
     def resize(self, size):
         self.setup_dimensions(size)
@@ -78,9 +124,49 @@ class GUI:
             except pygame.error:
                 print(f"Warning: Could not load image for {key}.")
 
+    def _render_background(self):
+        # Checkerboard, panel backgrounds, buttons and headers, drawn once per size preset
+        background = pygame.Surface((self.WIDTH, self.HEIGHT))
+        background.fill(BLACK)
+        pygame.draw.rect(background, (40, 40, 40), self.left_panel_rect)
+        pygame.draw.rect(background, (40, 40, 40), self.right_panel_rect)
+        for row in range(self.ROWS):
+            for col in range(self.COLS):
+                color = LIGHT_SQUARE if (row + col) % 2 == 0 else DARK_SQUARE
+                pygame.draw.rect(background, color, self.square_rect(row, col))
+        self.draw_undo_button(background)
+        self.draw_size_buttons(background)
+
+        title_surface = self.font.render("Move History", True, WHITE)
+        background.blit(title_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 10, 70)) # Adjusted y_offset
+        white_header_surface = self.font.render("White", True, WHITE)
+        background.blit(white_header_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 10, 100)) # Adjusted y_offset
+        black_header_surface = self.font.render("Black", True, WHITE)
+        background.blit(black_header_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 100, 100)) # Adjusted y_offset
+        return background
+
+    def draw_background(self, rect):
+        """ Restores rect to the static background of the current size """
+        self.screen.blit(self.background, rect, rect)
+
+    def render_text(self, text, font, color):
+        """ font.render(text, True, color), reused from an LRU cache """
+        key = (text, font, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.text_cache[key] = font.render(text, True, color)
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surface
+
+    @staticmethod
+    def _image_key(piece):
+        return f"{'w' if piece.color == 'white' else 'b'}_{piece.__class__.__name__.lower()}"
+
     def draw_left_panel(self, white_captured, black_captured):
-        panel_rect = pygame.Rect(0, 0, self.LEFT_PANEL_WIDTH, self.HEIGHT)
-        pygame.draw.rect(self.screen, (40, 40, 40), panel_rect)
+        self.draw_background(self.left_panel_rect) # Panel and undo button
         self.draw_captured_pieces(black_captured, 10) # Black captured pieces at the top
         # Calculate y_start for white captured pieces at the bottom
         # Assuming captured pieces are roughly CAPTURED_PIECE_SCALE * SQUARE_SIZE tall
@@ -91,41 +177,52 @@ class GUI:
             y_start_white = self.HEIGHT / 2 + 50
         self.draw_captured_pieces(white_captured, y_start_white) # White captured pieces at the bottom
 
-    def draw_right_panel(self, move_history):
-        panel_rect = pygame.Rect(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH, 0, self.RIGHT_PANEL_WIDTH, self.HEIGHT)
-        pygame.draw.rect(self.screen, (40, 40, 40), panel_rect)
+    def visible_move_rows(self):
+        return (self.HEIGHT - 30 - MOVE_LIST_TOP) // MOVE_ROW_HEIGHT + 1
 
-        self.draw_size_buttons() # Draw size buttons
+    def first_move_row(self, total_rows):
+        """ Index of the first move row shown, keeping the scroll position inside the list """
+        last_start = max(0, total_rows - self.visible_move_rows())
+        if self.move_list_scroll is None:
+            return last_start
+        return min(self.move_list_scroll, last_start)
 
-        title_surface = self.font.render("Move History", True, WHITE)
-        self.screen.blit(title_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 10, 70)) # Adjusted y_offset
+    def scroll_move_list(self, rows, total_rows):
+        """ Scrolls the move history by rows (negative is up); reaching the end follows new moves again """
+        last_start = max(0, total_rows - self.visible_move_rows())
+        first = min(max(0, self.first_move_row(total_rows) + rows), last_start)
+        self.move_list_scroll = None if first == last_start else first
 
-        white_header_surface = self.font.render("White", True, WHITE)
-        self.screen.blit(white_header_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 10, 100)) # Adjusted y_offset
-        black_header_surface = self.font.render("Black", True, WHITE)
-        self.screen.blit(black_header_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 100, 100)) # Adjusted y_offset
+    def draw_right_panel(self, move_history):
+        self.draw_background(self.right_panel_rect) # Panel, size buttons and headers
 
-        y_offset = 130 # Adjusted starting y_offset
-        move_number = 1
-        for move_pair in move_history:
-            if y_offset > self.HEIGHT - 30: break
+        # Only the rows in view are rendered, so long games cost the same per frame
+        visible = self.visible_move_rows()
+        first = self.first_move_row(len(move_history))
+        y_offset = MOVE_LIST_TOP
+        for move_number, move_pair in enumerate(move_history[first:first + visible], first + 1):
             if len(move_pair) > 0:
-                white_move = f"{move_number}. {move_pair[0]}"
-                white_move_surface = self.font.render(white_move, True, WHITE)
+                white_move_surface = self.render_text(f"{move_number}. {move_pair[0]}", self.font, WHITE)
                 self.screen.blit(white_move_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 10, y_offset))
-            
+
             if len(move_pair) > 1:
-                black_move = f"{move_pair[1]}"
-                black_move_surface = self.font.render(black_move, True, WHITE)
+                black_move_surface = self.render_text(move_pair[1], self.font, WHITE)
                 self.screen.blit(black_move_surface, (self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH + 110, y_offset))
-            y_offset += 25
-            move_number += 1
+            y_offset += MOVE_ROW_HEIGHT
+
+        if len(move_history) > visible:
+            # Scrollbar along the right edge of the list
+            track = pygame.Rect(self.WIDTH - 8, MOVE_LIST_TOP, 4, visible * MOVE_ROW_HEIGHT)
+            thumb_height = max(10, track.height * visible // len(move_history))
+            thumb_y = track.top + (track.height - thumb_height) * first // (len(move_history) - visible)
+            pygame.draw.rect(self.screen, (70, 70, 70), track)
+            pygame.draw.rect(self.screen, (160, 160, 160), (track.left, thumb_y, track.width, thumb_height))
 
     def draw_captured_pieces(self, captured_list, y_start):
         x_offset = 10
         y_offset = y_start
         for piece in captured_list:
-            key = f"{'w' if piece.color == 'white' else 'b'}_{piece.__class__.__name__.lower()}"
+            key = self._image_key(piece)
             if key in self.captured_piece_images:
                 self.screen.blit(self.captured_piece_images[key], (x_offset, y_offset))
                 x_offset += self.captured_piece_images[key].get_width() + 5
@@ -133,20 +230,20 @@ class GUI:
                     x_offset = 10
                     y_offset += self.captured_piece_images[key].get_height() + 5
     
-    def draw_board(self):
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                color = LIGHT_SQUARE if (row + col) % 2 == 0 else DARK_SQUARE
-                pygame.draw.rect(self.screen, color, (self.LEFT_PANEL_WIDTH + col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE))
-
-    def draw_pieces(self, board):
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                piece = board.get_piece(row, col)
-                if piece:
-                    key = f"{'w' if piece.color == 'white' else 'b'}_{piece.__class__.__name__.lower()}"
-                    if key in self.piece_images:
-                         self.screen.blit(self.piece_images[key], (self.LEFT_PANEL_WIDTH + col * self.SQUARE_SIZE, row * self.SQUARE_SIZE))
+    def square_rect(self, row, col):
+        return pygame.Rect(self.LEFT_PANEL_WIDTH + col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE)
+
+    def draw_square(self, row, col, image_key, cursor, selected, target):
+        """ One board square: background, piece, then the keyboard cursor, selection and move marker """
+        self.draw_background(self.square_rect(row, col))
+        if image_key in self.piece_images:
+            self.screen.blit(self.piece_images[image_key], (self.LEFT_PANEL_WIDTH + col * self.SQUARE_SIZE, row * self.SQUARE_SIZE))
+        if cursor:
+            self.highlight_keyboard_selection(row, col)
+        if selected:
+            self.highlight_square(row, col)
+        if target:
+            self.draw_possible_moves([(row, col)])
 
     def highlight_square(self, row, col, color=(255, 255, 0)):
         pygame.draw.rect(self.screen, color, (self.LEFT_PANEL_WIDTH + col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE), 5)
@@ -156,6 +253,10 @@ class GUI:
         if king_pos:
             self.highlight_square(king_pos[0], king_pos[1], color)
 
+    def _king_rect(self, board):
+        king_pos = board.find_king(board.turn)
+        return self.square_rect(*king_pos) if king_pos else pygame.Rect(0, 0, 0, 0)
+
     def highlight_keyboard_selection(self, row, col):
         pygame.draw.rect(self.screen, (0, 0, 255), (self.LEFT_PANEL_WIDTH + col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE), 3)
 
@@ -164,26 +265,26 @@ class GUI:
             end_row, end_col = move
             pygame.draw.circle(self.screen, (0, 255, 0), (self.LEFT_PANEL_WIDTH + end_col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2, end_row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2), 15)
 
-    def draw_undo_button(self):
-        pygame.draw.rect(self.screen, (100, 100, 100), self.undo_button_rect)
-        pygame.draw.rect(self.screen, WHITE, self.undo_button_rect, 2)
+    def draw_undo_button(self, surface):
+        pygame.draw.rect(surface, (100, 100, 100), self.undo_button_rect)
+        pygame.draw.rect(surface, WHITE, self.undo_button_rect, 2)
         text_surface = self.button_font.render("Undo", True, WHITE)
         text_rect = text_surface.get_rect(center=self.undo_button_rect.center)
-        self.screen.blit(text_surface, text_rect)
+        surface.blit(text_surface, text_rect)
 
-    def draw_size_buttons(self):
+    def draw_size_buttons(self, surface):
         s_text = self.button_font.render("S", True, WHITE)
         m_text = self.button_font.render("M", True, WHITE)
         l_text = self.button_font.render("L", True, WHITE)
 
         # Draw individual buttons
-        pygame.draw.rect(self.screen, (100, 100, 100) if self.size == 'small' else (50,50,50), self.small_button_rect)
-        pygame.draw.rect(self.screen, (100, 100, 100) if self.size == 'medium' else (50,50,50), self.medium_button_rect)
-        pygame.draw.rect(self.screen, (100, 100, 100) if self.size == 'large' else (50,50,50), self.large_button_rect)
+        pygame.draw.rect(surface, (100, 100, 100) if self.size == 'small' else (50,50,50), self.small_button_rect)
+        pygame.draw.rect(surface, (100, 100, 100) if self.size == 'medium' else (50,50,50), self.medium_button_rect)
+        pygame.draw.rect(surface, (100, 100, 100) if self.size == 'large' else (50,50,50), self.large_button_rect)
 
-        self.screen.blit(s_text, s_text.get_rect(center=self.small_button_rect.center))
-        self.screen.blit(m_text, m_text.get_rect(center=self.medium_button_rect.center))
-        self.screen.blit(l_text, l_text.get_rect(center=self.large_button_rect.center))
+        surface.blit(s_text, s_text.get_rect(center=self.small_button_rect.center))
+        surface.blit(m_text, m_text.get_rect(center=self.medium_button_rect.center))
+        surface.blit(l_text, l_text.get_rect(center=self.large_button_rect.center))
 
         # Draw border around the group of buttons
         group_rect_x = self.small_button_rect.left - 5
@@ -191,29 +292,35 @@ class GUI:
         group_rect_width = (self.large_button_rect.right - self.small_button_rect.left) + 10
         group_rect_height = self.small_button_rect.height + 10
         group_rect = pygame.Rect(group_rect_x, group_rect_y, group_rect_width, group_rect_height)
-        pygame.draw.rect(self.screen, WHITE, group_rect, 2)
+        pygame.draw.rect(surface, WHITE, group_rect, 2)
+
+    def _tooltip_rect(self):
+        text_surface = self.render_text("Press 'u' or Backspace", self.tooltip_font, BLACK)
+        return text_surface.get_rect(midbottom=self.undo_button_rect.midtop).inflate(10, 5)
 
     def draw_tooltip(self, mouse_pos):
         if mouse_pos and self.undo_button_rect.collidepoint(mouse_pos):
             tooltip_text = "Press 'u' or Backspace"
-            text_surface = self.tooltip_font.render(tooltip_text, True, BLACK)
+            text_surface = self.render_text(tooltip_text, self.tooltip_font, BLACK)
             tooltip_rect = text_surface.get_rect(midbottom=self.undo_button_rect.midtop)
             background_rect = tooltip_rect.inflate(10, 5)
             pygame.draw.rect(self.screen, WHITE, background_rect)
             pygame.draw.rect(self.screen, BLACK, background_rect, 1)
             self.screen.blit(text_surface, tooltip_rect)
 
+    def _check_rect(self):
+        text_surface = self.render_text("Check!", self.notification_font, ORANGE_RED)
+        return text_surface.get_rect(center=(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH / 2, self.HEIGHT / 2))
+
     def draw_check_notification(self):
-        text_surface = self.notification_font.render("Check!", True, ORANGE_RED)
+        text_surface = self.render_text("Check!", self.notification_font, ORANGE_RED)
         text_rect = text_surface.get_rect(center=(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH / 2, self.HEIGHT / 2))
         self.screen.blit(text_surface, text_rect)
 
     def draw_checkmate_notification(self, winner):
-        overlay = pygame.Surface((self.BOARD_WIDTH, self.HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        self.screen.blit(overlay, (self.LEFT_PANEL_WIDTH, 0))
+        self.screen.blit(self.game_over_overlay, (self.LEFT_PANEL_WIDTH, 0))
 
-        game_over_text = self.notification_font.render("Game Over", True, RED)
+        game_over_text = self.render_text("Game Over", self.notification_font, RED)
         game_over_rect = game_over_text.get_rect(center=(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH / 2, self.HEIGHT / 2 - 30))
         self.screen.blit(game_over_text, game_over_rect)
 
@@ -221,34 +328,82 @@ class GUI:
             winner_text_str = f"{winner.capitalize()} wins!"
         else:
             winner_text_str = "It's a draw!"
-        winner_text = self.font.render(winner_text_str, True, WHITE)
+        winner_text = self.render_text(winner_text_str, self.font, WHITE)
         winner_rect = winner_text.get_rect(center=(self.LEFT_PANEL_WIDTH + self.BOARD_WIDTH / 2, self.HEIGHT / 2 + 30))
         self.screen.blit(winner_text, winner_rect)
 
-    def update_display(self, board, selected_piece=None, possible_moves=[], mouse_pos=None, is_check=False, game_over_winner=None, keyboard_cursor_pos=None):
-        self.screen.fill(BLACK)
-        self.draw_left_panel(board.white_captured, board.black_captured)
-        self.draw_right_panel(board.move_log)
-        self.draw_board()
-        self.draw_pieces(board)
-        
-        if keyboard_cursor_pos:
-            self.highlight_keyboard_selection(keyboard_cursor_pos[0], keyboard_cursor_pos[1])
+    def _fps_rect(self):
+        text_surface = self.render_text(self.fps_text, self.tooltip_font, WHITE)
+        return text_surface.get_rect(bottomleft=(5, self.HEIGHT - 5))
 
-        if selected_piece:
-            r, c = selected_piece
-            self.highlight_square(r, c)
-            self.draw_possible_moves(possible_moves)
-        
-        self.draw_undo_button()
-        self.draw_tooltip(mouse_pos)
+    def draw_fps(self):
+        self.screen.blit(self.render_text(self.fps_text, self.tooltip_font, WHITE), self._fps_rect())
 
+    def _overlays(self, board, mouse_pos, is_check, game_over_winner):
+        # Everything drawn on top of the panels and squares, in drawing order, as
+        # (state, screen rect, draw function). A region is redrawn when the states
+        # of the overlays covering it change, and draws them clipped to itself.
+        overlays = []
+        if mouse_pos and self.undo_button_rect.collidepoint(mouse_pos):
+            overlays.append((("tooltip",), self._tooltip_rect(), lambda: self.draw_tooltip(mouse_pos)))
         if is_check:
-            self.draw_check_notification()
-            self.highlight_king(board, ORANGE_RED)
-
+            overlays.append((("check",), self._check_rect(), self.draw_check_notification))
+            overlays.append((("check_king",), self._king_rect(board), lambda: self.highlight_king(board, ORANGE_RED)))
         if game_over_winner:
-            self.draw_checkmate_notification(game_over_winner)
-            self.highlight_king(board, RED)
+            overlays.append((("game_over", game_over_winner), self.board_rect, lambda: self.draw_checkmate_notification(game_over_winner)))
+            overlays.append((("game_over_king",), self._king_rect(board), lambda: self.highlight_king(board, RED)))
+        if self.fps_text:
+            overlays.append((("fps", self.fps_text), self._fps_rect(), self.draw_fps))
+        return overlays
+
+    def _redraw(self, name, rect, state, overlays, draw, dirty):
+        # Draws region name if it changed since the last frame, then the overlays that cover it
+        covering = [overlay for overlay in overlays if overlay[1].colliderect(rect)]
+        state = (state, tuple(overlay[0] for overlay in covering))
+        if self._drawn.get(name) == state:
+            return
+        self.screen.set_clip(rect)
+        draw()
+        for _, _, draw_overlay in covering:
+            draw_overlay()
+        self.screen.set_clip(None)
+        self._drawn[name] = state
+        dirty.append(rect)
 
-        pygame.display.update()
\ No newline at end of file
+    def update_display(self, board, selected_piece=None, possible_moves=[], mouse_pos=None, is_check=False, game_over_winner=None, keyboard_cursor_pos=None):
+        """ Redraws the panels and squares whose contents changed since the last call and
+        pushes only those rects to the display """
+        start = time.perf_counter()
+        if not self.dirty_rendering:
+            self.invalidate()
+        full = not self._drawn
+        overlays = self._overlays(board, mouse_pos, is_check, game_over_winner)
+        dirty = []
+        white_captured = tuple(map(self._image_key, board.white_captured))
+        black_captured = tuple(map(self._image_key, board.black_captured))
+        self._redraw("left", self.left_panel_rect, (white_captured, black_captured), overlays,
+                     lambda: self.draw_left_panel(board.white_captured, board.black_captured), dirty)
+        # Only the rows in view matter, so this stays cheap however long the game is
+        first = self.first_move_row(len(board.move_log))
+        rows = tuple(map(tuple, board.move_log[first:first + self.visible_move_rows()]))
+        self._redraw("right", self.right_panel_rect, (first, len(board.move_log), rows), overlays, lambda: self.draw_right_panel(board.move_log), dirty)
+
+        targets = set(possible_moves) if selected_piece else ()
+        cursor = tuple(keyboard_cursor_pos) if keyboard_cursor_pos else None
+        for row in range(self.ROWS):
+            for col in range(self.COLS):
+                piece = board.get_piece(row, col)
+                state = (self._image_key(piece) if piece else None, (row, col) == cursor, (row, col) == selected_piece, (row, col) in targets)
+                self._redraw((row, col), self.square_rect(row, col), state, overlays,
+                             lambda row=row, col=col, state=state: self.draw_square(row, col, *state), dirty)
+
+        if full:
+            pygame.display.update()
+        elif dirty:
+            pygame.display.update(dirty)
+
+        elapsed = time.perf_counter() - start
+        self.frame_count += 1
+        self.frame_time_total += elapsed
+        self.last_frame_ms = elapsed * 1000
+        self.last_dirty_rects = len(dirty)
@@ -1,6 +1,15 @@
+import argparse
+
 import pygame
 from models import Board
 from gui import GUI
+import book
+import engine
+import tablebase
+import worker
+
+FPS_REFRESH_MS = 500 # How often the on-screen FPS readout is updated
+FPS_PRINT_MS = 5000 # How often it is also printed to the terminal
 
 def get_row_col_from_mouse(pos, gui):
     x, y = pos
@@ -8,7 +17,7 @@ def get_row_col_from_mouse(pos, gui):
     col = (x - gui.LEFT_PANEL_WIDTH) // gui.SQUARE_SIZE
     return row, col
 
-def main():
+def main(engine_color=None, engine_time_ms=1000, engine_hash_mb=16, book_path=None, tablebase_dir=None, max_fps=60, show_fps=False):
     pygame.init()
     gui = GUI(None, "medium") # Initialize GUI with default medium size
     screen = pygame.display.set_mode((gui.WIDTH, gui.HEIGHT))
@@ -17,6 +26,12 @@ def main():
 
     board = Board()
     gui = GUI(screen)
+    opening_book = book.OpeningBook(book_path) if book_path and engine_color else None
+    endgames = tablebase.Tablebase(tablebase_dir) if tablebase_dir else None
+    computer = engine.Engine(engine_hash_mb, opening_book, endgames)
+    # Engine moves, hints and evaluations run here so the loop below keeps drawing
+    background = worker.EngineWorker(computer)
+    engine_thinking = False
 
     selected_piece = None # Tuple (row, col)
     possible_moves = []
@@ -25,21 +40,41 @@ def main():
     game_over = False
     keyboard_cursor_pos = (0, 0)
 
+    clock = pygame.time.Clock()
+    readout_start = printed_at = pygame.time.get_ticks()
+    readout_frames, readout_time = gui.frame_count, gui.frame_time_total
+
     running = True
     while running:
+        if background.pending():
+            events = pygame.event.get() # Keep looping until the engine's result has been picked up
+        else:
+            # Nothing is animating or being computed: sleep until there is input. With the
+            # readout on, wake up regularly so it can show the idle frame rate.
+            events = [pygame.event.wait(FPS_REFRESH_MS) if show_fps else pygame.event.wait()]
+            events += pygame.event.get()
         mouse_pos = pygame.mouse.get_pos()
 
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                gui.invalidate() # The window contents may have been lost
+            elif event.type == pygame.MOUSEWHEEL and gui.right_panel_rect.collidepoint(pygame.mouse.get_pos()):
+                gui.scroll_move_list(-event.y, len(board.move_log)) # Wheel up shows earlier moves
 
             if not game_over:
-                if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 2, 3): # Buttons 4 and 5 are the wheel
                     pos = pygame.mouse.get_pos()
                     
                     # Check if the undo button was clicked
                     if gui.undo_button_rect.collidepoint(pos):
+                        background.cancel()
+                        engine_thinking = False
                         if board.undo_move():
+                            # Take back the engine's reply too, so it's the human's turn again
+                            if board.turn == engine_color:
+                                board.undo_move()
                             selected_piece = None
                             possible_moves = []
                             is_check = board.is_in_check(board.turn)
@@ -76,11 +111,15 @@ def main():
                         possible_moves = []
                         continue # Ignore clicks outside the board
 
+                    if board.turn == engine_color:
+                        continue # The engine is thinking about its move
+
                     if selected_piece:
                         end_pos_alg = board._coords_to_algebraic(row, col)
                         start_pos_alg = board._coords_to_algebraic(selected_piece[0], selected_piece[1])
                         
                         if board.move_piece(start_pos_alg, end_pos_alg):
+                            background.cancel() # Hints and evaluations were for the old position
                             previous_turn = board.turn
                             board.switch_turn() # Switch turn only if a valid move is made
                             
@@ -95,6 +134,10 @@ def main():
                                 game_over = True
                                 game_over_winner = "draw"
                                 print("Stalemate! It's a draw.")
+                            elif endgames and endgames.adjudicate(board):
+                                game_over = True
+                                game_over_winner = "draw"
+                                print("Drawn endgame according to the tablebase.")
                         
                         selected_piece = None
                         possible_moves = []
@@ -102,18 +145,17 @@ def main():
                         piece = board.get_piece(row, col)
                         if piece and piece.color == board.turn:
                             selected_piece = (row, col)
-                            # Generate and store possible moves by filtering all possible moves
-                            all_moves = board.get_all_possible_moves(piece.color)
-                            possible_moves = []
-                            start_pos_alg_selected = board._coords_to_algebraic(row, col)
-                            for start_pos_alg, end_pos_alg in all_moves:
-                                if start_pos_alg == start_pos_alg_selected:
-                                    r_end, c_end = board._algebraic_to_coords(end_pos_alg)
-                                    possible_moves.append((r_end, c_end))
+                            # Legal moves of this piece, from the index shared with the checkmate/stalemate checks
+                            possible_moves = list(board.legal_move_index(piece.color).get((row, col), ()))
                 
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_u or event.key == pygame.K_BACKSPACE:
+                        background.cancel()
+                        engine_thinking = False
                         if board.undo_move():
+                            # Take back the engine's reply too, so it's the human's turn again
+                            if board.turn == engine_color:
+                                board.undo_move()
                             selected_piece = None
                             possible_moves = []
                             is_check = board.is_in_check(board.turn)
@@ -128,13 +170,17 @@ def main():
                         keyboard_cursor_pos = (keyboard_cursor_pos[0], max(0, keyboard_cursor_pos[1] - 1))
                     elif event.key == pygame.K_RIGHT:
                         keyboard_cursor_pos = (keyboard_cursor_pos[0], min(7, keyboard_cursor_pos[1] + 1))
-                    elif event.key == pygame.K_RETURN:
+                    elif event.key in (pygame.K_h, pygame.K_e) and board.turn != engine_color:
+                        # Hint (best move for the side to move) or evaluation breakdown, computed in the background
+                        background.submit(worker.HINT if event.key == pygame.K_h else worker.EVALUATION, board, engine_time_ms)
+                    elif event.key == pygame.K_RETURN and board.turn != engine_color:
                         row, col = keyboard_cursor_pos
                         if selected_piece:
                             end_pos_alg = board._coords_to_algebraic(row, col)
                             start_pos_alg = board._coords_to_algebraic(selected_piece[0], selected_piece[1])
                             
                             if board.move_piece(start_pos_alg, end_pos_alg):
+                                background.cancel()
                                 previous_turn = board.turn
                                 board.switch_turn()
                                 
@@ -146,6 +192,9 @@ def main():
                                 elif board.is_stalemate(board.turn):
                                     game_over = True
                                     game_over_winner = "draw"
+                                elif endgames and endgames.adjudicate(board):
+                                    game_over = True
+                                    game_over_winner = "draw"
                             
                             selected_piece = None
                             possible_moves = []
@@ -153,17 +202,95 @@ def main():
                             piece = board.get_piece(row, col)
                             if piece and piece.color == board.turn:
                                 selected_piece = (row, col)
-                                all_moves = board.get_all_possible_moves(piece.color)
-                                possible_moves = []
-                                start_pos_alg_selected = board._coords_to_algebraic(row, col)
-                                for start_pos_alg, end_pos_alg in all_moves:
-                                    if start_pos_alg == start_pos_alg_selected:
-                                        r_end, c_end = board._algebraic_to_coords(end_pos_alg)
-                                        possible_moves.append((r_end, c_end))
+                                possible_moves = list(board.legal_move_index(piece.color).get((row, col), ()))
+
+        if board.turn == engine_color and not game_over and not engine_thinking:
+            background.submit(worker.MOVE, board, engine_time_ms)
+            engine_thinking = True
+
+        finished = background.poll()
+        if finished and finished[0] == worker.ERROR:
+            failed_kind, error = finished[1]
+            print(f"Engine {failed_kind} failed: {error}")
+            if failed_kind == worker.MOVE:
+                # Hand the engine's side to the human rather than retrying the same job forever
+                engine_thinking = False
+                engine_color = None
+                print("The computer stopped playing; you now play both sides.")
+        elif finished and finished[0] == worker.HINT:
+            result = finished[1]
+            if result.move:
+                print(f"Hint: {result.move[0]}{result.move[1]} (depth {result.depth}, score {result.score})")
+                # Select the hinted piece so its target square is highlighted
+                selected_piece = board._algebraic_to_coords(result.move[0])
+                possible_moves = [board._algebraic_to_coords(result.move[1])]
+        elif finished and finished[0] == worker.EVALUATION:
+            terms = finished[1]
+            for color in ("white", "black"):
+                print(f"{color.capitalize()}: " + ", ".join(f"{name} {value}" for name, value in terms[color].items()))
+            print(f"Evaluation (white's view): {terms['total']}")
+        elif finished and finished[0] == worker.MOVE:
+            result = finished[1]
+            engine_thinking = False
+            if not (result.move and board.move_piece(*result.move)):
+                # Resubmitting would produce the same move and hang on the engine's turn
+                print(f"Engine move {result.move} is not legal here; you now play both sides.")
+                engine_color = None
+            else:
+                tt_stats = computer.tt.stats()
+                if not result.depth:
+                    print(f"Engine plays {result.move[0]}{result.move[1]} from the book")
+                else:
+                    print(f"Engine plays {result.move[0]}{result.move[1]}: depth {result.depth}, score {result.score}, "
+                          f"{result.nodes} nodes in {result.elapsed:.2f}s ({result.nps:.0f} nodes/s), "
+                          f"hash hits {tt_stats['hit_rate']:.0%}, hashfull {tt_stats['hashfull']}/1000")
+                previous_turn = board.turn
+                board.switch_turn()
+
+                is_check = board.is_in_check(board.turn)
+
+                if board.is_checkmate(board.turn):
+                    game_over = True
+                    game_over_winner = previous_turn
+                    print(f"Checkmate! {board.turn.capitalize()} loses.")
+                elif board.is_stalemate(board.turn):
+                    game_over = True
+                    game_over_winner = "draw"
+                    print("Stalemate! It's a draw.")
+                elif endgames and endgames.adjudicate(board):
+                    game_over = True
+                    game_over_winner = "draw"
+                    print("Drawn endgame according to the tablebase.")
+
+        if show_fps:
+            now = pygame.time.get_ticks()
+            if now - readout_start >= FPS_REFRESH_MS:
+                frames = gui.frame_count - readout_frames
+                frame_ms = (gui.frame_time_total - readout_time) * 1000 / frames if frames else 0.0
+                gui.fps_text = f"{frames * 1000 / (now - readout_start):.0f} fps, {frame_ms:.2f} ms/frame"
+                readout_start, readout_frames, readout_time = now, gui.frame_count, gui.frame_time_total
+                if now - printed_at >= FPS_PRINT_MS:
+                    print(gui.fps_text)
+                    printed_at = now
 
         gui.update_display(board, selected_piece, possible_moves, mouse_pos, is_check, game_over_winner, keyboard_cursor_pos)
+        clock.tick(max_fps) # Caps the frame rate while events or engine work keep the loop busy
 
+    background.close()
+    stats = gui.frame_stats()
+    print(f"Rendered {stats['frames']} frames, {stats['average_ms']:.2f} ms per frame on average")
+    if opening_book:
+        opening_book.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Chess")
+    parser.add_argument("--engine", choices=["white", "black"], help="let the computer play this color")
+    parser.add_argument("--engine-time", type=int, default=1000, help="engine thinking time per move in milliseconds")
+    parser.add_argument("--engine-hash", type=int, default=16, help="engine transposition table size in MB")
+    parser.add_argument("--book", help="opening book file built with book.py")
+    parser.add_argument("--tablebase", help="directory of endgame tables generated with tablebase.py")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate cap, 0 for none (default 60)")
+    parser.add_argument("--show-fps", action="store_true", help="show the frame rate and frame time on screen and in the terminal")
+    args = parser.parse_args()
+    main(args.engine, args.engine_time, args.engine_hash, args.book, args.tablebase, args.fps, args.show_fps)
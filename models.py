@@ -1,14 +1,179 @@
-import copy
+from collections import namedtuple
+
+import bitboard
+import zobrist
+from bitboard import BETWEEN, COLOR_INDEX, FULL, KING, PAWN, ROOK, WHITE, Bitboards, bit_scan
+from evaluation import PIECE_SQUARE_VALUES
+from zobrist import CASTLING_KEYS, EN_PASSANT_KEYS, PIECE_KEYS, SIDE_KEY
+
+# Castling rights bits, as used by Board.castling_rights()
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_FLAGS = ((WHITE_KINGSIDE, 'K'), (WHITE_QUEENSIDE, 'Q'), (BLACK_KINGSIDE, 'k'), (BLACK_QUEENSIDE, 'q'))
+
+# FEN letter of each piece kind, indexed by Piece.kind
+FEN_LETTERS = "pnbrqk"
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Everything needed to take back one move; kept small so history and search stay cheap
+MoveRecord = namedtuple('MoveRecord', [
+    'start_row', 'start_col', 'end_row', 'end_col', 'piece', 'captured',
+    'rook', 'rook_start_col', 'rook_end_col',
+    'piece_had_moved', 'rook_had_moved',
+    'white_captured_len', 'black_captured_len', 'turn', 'en_passant',
+])
 
 class Board:
     def __init__(self):
+        self._init_empty()
+        self._populate_board()
+        self._sync_bitboards()
+        self.zobrist_key = zobrist.compute_key(self)
+
+    def _init_empty(self):
         self.board = self._create_board()
         self.turn = "white"
-        self.history = [] # Added for undo functionality
+        self.history = [] # MoveRecords for undo functionality
         self.move_log = [] # Added for move history
         self.white_captured = []
         self.black_captured = []
-        self._populate_board()
+        self.en_passant = None # Square skipped by the last double pawn push, if any
+        self.first_fullmove = 1 # Fullmove number the game was set up with
+        self.bitboards = Bitboards()
+        # Squares holding each color's pieces and each color's king square, indexed by COLOR_INDEX
+        self.piece_squares = [set(), set()]
+        self.king_squares = [None, None]
+        # Material plus piece-square score of each color, kept up to date like the bitboards
+        self.piece_square_score = [0, 0]
+        self.zobrist_key = 0
+        # [white map, black map, white counts, black counts], filled in on first use
+        # and dropped whenever a square changes
+        self._attack_cache = None
+        # [white index, black index] of legal moves grouped by origin, same lifetime as _attack_cache
+        self._legal_move_index = None
+
+    @classmethod
+    def from_fen(cls, fen):
+        fields = fen.split()
+        if len(fields) < 2:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        placement, turn = fields[0], fields[1]
+        castling = fields[2] if len(fields) > 2 else "-"
+        en_passant = fields[3] if len(fields) > 3 else "-"
+
+        board = cls.__new__(cls)
+        board._init_empty()
+        ranks = placement.split('/')
+        if len(ranks) != 8 or turn not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                kind = FEN_LETTERS.find(char.lower())
+                if kind < 0 or col > 7:
+                    raise ValueError(f"Invalid FEN: {fen!r}")
+                board.board[row][col] = PIECE_CLASSES[kind]("white" if char.isupper() else "black")
+                col += 1
+            if col != 8:
+                raise ValueError(f"Invalid FEN: {fen!r}")
+
+        rights = 0
+        for bit, flag in CASTLING_FLAGS:
+            if flag in castling:
+                rights |= bit
+
+        en_passant_square = None
+        if en_passant != "-":
+            # Only the square just skipped by the opponent's double push: rank 6 for white to
+            # move, rank 3 for black, empty, with the pushed pawn right in front of it
+            rank = "6" if turn == "w" else "3"
+            if len(en_passant) != 2 or en_passant[0] not in "abcdefgh" or en_passant[1] != rank:
+                raise ValueError(f"Invalid FEN: {fen!r}")
+            row, col = board._algebraic_to_coords(en_passant)
+            pawn = board.board[row + 1 if turn == "w" else row - 1][col]
+            if board.board[row][col] or not (pawn and pawn.kind == PAWN and pawn.color == ("black" if turn == "w" else "white")):
+                raise ValueError(f"Invalid FEN: {fen!r}")
+            en_passant_square = (row, col)
+
+        if len(fields) > 5 and fields[5].isdigit():
+            board.first_fullmove = int(fields[5])
+        board._finish_setup("white" if turn == "w" else "black", rights, en_passant_square)
+        return board
+
+    def to_fen(self):
+        ranks = []
+        for row in self.board:
+            rank = ""
+            empty = 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[piece.kind]
+                rank += letter.upper() if piece.color == "white" else letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        rights = self.castling_rights()
+        castling = "".join(flag for bit, flag in CASTLING_FLAGS if rights & bit) or "-"
+        en_passant = self._coords_to_algebraic(*self.en_passant) if self.en_passant else "-"
+        # No fifty-move rule is tracked, so the halfmove clock is always 0
+        black_moves = len(self.move_log) - (1 if self.move_log and len(self.move_log[-1]) == 1 else 0)
+        return f"{'/'.join(ranks)} {self.turn[0]} {castling} {en_passant} 0 {self.first_fullmove + black_moves}"
+
+    def to_bytes(self):
+        """ 34-byte encoding: a 4-bit code per square, then side/castling and en-passant bytes """
+        data = bytearray(34)
+        for color, squares in enumerate(self.piece_squares):
+            for sq in squares:
+                code = self.board[sq >> 3][sq & 7].kind + (1 if color == 0 else 9)
+                data[sq >> 1] |= code << ((sq & 1) * 4)
+        data[32] = (1 if self.turn == "black" else 0) | self.castling_rights() << 1
+        data[33] = self.en_passant[0] * 8 + self.en_passant[1] if self.en_passant else 0xFF
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        board = cls.__new__(cls)
+        board._init_empty()
+        squares = board.board
+        for sq in range(64):
+            code = data[sq >> 1] >> ((sq & 1) * 4) & 0xF
+            if code:
+                squares[sq >> 3][sq & 7] = PIECE_CLASSES[(code & 7) - 1]("white" if code < 8 else "black")
+        board._finish_setup(
+            "black" if data[32] & 1 else "white",
+            data[32] >> 1,
+            divmod(data[33], 8) if data[33] != 0xFF else None,
+        )
+        return board
+
+    def _finish_setup(self, turn, rights, en_passant):
+        # Build the bitboards, derive has_moved flags from castling rights and pawn ranks, then hash.
+        # Every other piece counts as moved, so only the king and rooks named by the rights can castle.
+        self._sync_bitboards()
+        for squares in self.piece_squares:
+            for sq in squares:
+                piece = self.board[sq >> 3][sq & 7]
+                if piece.kind == PAWN:
+                    piece.has_moved = sq >> 3 != (6 if piece.color == "white" else 1)
+                else:
+                    piece.has_moved = True
+        for row, color, kingside, queenside in ((7, "white", WHITE_KINGSIDE, WHITE_QUEENSIDE), (0, "black", BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            for col, kind, needed in ((4, KING, kingside | queenside), (7, ROOK, kingside), (0, ROOK, queenside)):
+                piece = self.board[row][col]
+                if piece and piece.kind == kind and piece.color == color and rights & needed:
+                    piece.has_moved = False
+
+        self.turn = turn
+        self.en_passant = en_passant
+        self.zobrist_key = zobrist.compute_key(self)
 
     def _create_board(self):
         board = []
@@ -41,6 +206,77 @@ class Board:
         for i in range(8):
             self.board[1][i] = Pawn("black")
 
+    def _sync_bitboards(self):
+        # Rebuild the bitboards and piece lists from the 8x8 array (after setup or restoring a snapshot)
+        self.bitboards = Bitboards()
+        self.piece_squares = [set(), set()]
+        self.king_squares = [None, None]
+        self.piece_square_score = [0, 0]
+        for r, row in enumerate(self.board):
+            for c, piece in enumerate(row):
+                if piece:
+                    color = piece.side
+                    self.bitboards.add(r * 8 + c, color, piece.kind)
+                    self.piece_squares[color].add(r * 8 + c)
+                    self.piece_square_score[color] += PIECE_SQUARE_VALUES[color][piece.kind][r * 8 + c]
+                    if piece.kind == KING:
+                        self.king_squares[color] = r * 8 + c
+        self._attack_cache = None
+        self._legal_move_index = None
+
+    def _set_square(self, row, col, piece):
+        # Every change to self.board goes through here so the bitboards and piece lists stay in sync
+        sq = row * 8 + col
+        old_piece = self.board[row][col]
+        if old_piece:
+            color = old_piece.side
+            self.bitboards.remove(sq, color, old_piece.kind)
+            self.piece_squares[color].discard(sq)
+            # The king may already have been placed on its new square
+            if old_piece.kind == KING and self.king_squares[color] == sq:
+                self.king_squares[color] = None
+            self.piece_square_score[color] -= PIECE_SQUARE_VALUES[color][old_piece.kind][sq]
+            self.zobrist_key ^= PIECE_KEYS[color][old_piece.kind][sq]
+        if piece:
+            color = piece.side
+            self.bitboards.add(sq, color, piece.kind)
+            self.piece_squares[color].add(sq)
+            if piece.kind == KING:
+                self.king_squares[color] = sq
+            self.piece_square_score[color] += PIECE_SQUARE_VALUES[color][piece.kind][sq]
+            self.zobrist_key ^= PIECE_KEYS[color][piece.kind][sq]
+        self.board[row][col] = piece
+        self._attack_cache = None
+        self._legal_move_index = None
+
+    def castling_rights(self):
+        # Derived from the has_moved flags of the kings and the corner rooks
+        rights = 0
+        for row, color, kingside, queenside in ((7, "white", WHITE_KINGSIDE, WHITE_QUEENSIDE), (0, "black", BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            king = self.board[row][4]
+            if not (king and king.kind == KING and king.color == color and not king.has_moved):
+                continue
+            for col, right in ((7, kingside), (0, queenside)):
+                rook = self.board[row][col]
+                if rook and rook.kind == ROOK and rook.color == color and not rook.has_moved:
+                    rights |= right
+        return rights
+
+    def _en_passant_key(self):
+        # Like Polyglot, the en-passant file only counts when a pawn stands ready to capture
+        if self.en_passant is None:
+            return 0
+        row, col = self.en_passant
+        # The pushed pawn sits one row past the skipped square
+        pawn_row = row - 1 if row == 5 else row + 1
+        pawn = self.board[pawn_row][col]
+        for c in (col - 1, col + 1):
+            if 0 <= c < 8:
+                neighbour = self.board[pawn_row][c]
+                if neighbour and neighbour.kind == PAWN and neighbour.side != pawn.side:
+                    return EN_PASSANT_KEYS[col]
+        return 0
+
     def display(self):
         print("  a b c d e f g h")
         for i, row in enumerate(self.board):
@@ -66,15 +302,16 @@ class Board:
 
     def switch_turn(self):
         self.turn = "black" if self.turn == "white" else "white"
+        self.zobrist_key ^= SIDE_KEY
+        self._legal_move_index = None
 
     def undo_move(self):
         if self.history:
-            previous_state = self.history.pop()
-            self.board = previous_state['board_layout']
-            self.turn = previous_state['current_turn']
-            self.white_captured = previous_state['white_captured']
-            self.black_captured = previous_state['black_captured']
-            
+            record = self.history.pop()
+            self.unmake_move(record)
+            if self.turn != record.turn:
+                self.switch_turn()
+
             # Also undo the move log
             if self.move_log:
                 if len(self.move_log[-1]) == 2:
@@ -85,20 +322,36 @@ class Board:
         return False
 
     def find_king(self, color):
-        for r, row in enumerate(self.board):
-            for c, piece in enumerate(row):
-                if isinstance(piece, King) and piece.color == color:
-                    return r, c
-        return None
+        sq = self.king_squares[COLOR_INDEX[color]]
+        if sq is None:
+            return None
+        return divmod(sq, 8)
+
+    def attacked_squares(self, color):
+        """ Bitboard of every square attacked by color, cached until the position changes """
+        side = COLOR_INDEX[color]
+        cache = self._attack_cache
+        if cache is None:
+            cache = self._attack_cache = [None, None, None, None]
+        attacked = cache[side]
+        if attacked is None:
+            attacked = cache[side] = self.bitboards.attacks(side)
+        return attacked
+
+    def attacker_count(self, row, col, color):
+        """ Number of color pieces attacking (row, col), cached until the position changes """
+        side = COLOR_INDEX[color]
+        cache = self._attack_cache
+        if cache is None:
+            cache = self._attack_cache = [None, None, None, None]
+        counts = cache[side + 2]
+        if counts is None:
+            counts = cache[side + 2] = self.bitboards.attack_counts(side)
+        return counts[row * 8 + col]
 
     def is_square_attacked(self, row, col, attacker_color):
         """ Check if a square (row, col) is attacked by a piece of attacker_color """
-        for r, row_list in enumerate(self.board):
-            for c, piece in enumerate(row_list):
-                if piece and piece.color == attacker_color:
-                    if piece.is_valid_move(self, r, c, row, col):
-                        return True
-        return False
+        return self.attacked_squares(attacker_color) >> (row * 8 + col) & 1 == 1
 
     def is_in_check(self, color):
         king_pos = self.find_king(color)
@@ -109,14 +362,15 @@ class Board:
         return self.is_square_attacked(king_pos[0], king_pos[1], opponent_color)
 
     def _is_valid_castle(self, start_row, start_col, end_row, end_col):
-        if self.is_in_check(self.turn):
+        color = self.get_piece(start_row, start_col).color
+        opponent_color = 'black' if color == 'white' else 'white'
+        if self.is_in_check(color):
             return False
 
         # Kingside castle
         if end_col == 6:
             rook = self.get_piece(start_row, 7)
-            if rook and not rook.has_moved and not self.get_piece(start_row, 5) and not self.get_piece(start_row, 6):
-                opponent_color = 'black' if self.turn == 'white' else 'white'
+            if rook and rook.kind == ROOK and rook.color == color and not rook.has_moved and not self.get_piece(start_row, 5) and not self.get_piece(start_row, 6):
                 if not self.is_square_attacked(start_row, 4, opponent_color) and \
                    not self.is_square_attacked(start_row, 5, opponent_color) and \
                    not self.is_square_attacked(start_row, 6, opponent_color):
@@ -124,40 +378,149 @@ class Board:
         # Queenside castle
         elif end_col == 2:
             rook = self.get_piece(start_row, 0)
-            if rook and not rook.has_moved and not self.get_piece(start_row, 1) and not self.get_piece(start_row, 2) and not self.get_piece(start_row, 3):
-                opponent_color = 'black' if self.turn == 'white' else 'white'
+            if rook and rook.kind == ROOK and rook.color == color and not rook.has_moved and not self.get_piece(start_row, 1) and not self.get_piece(start_row, 2) and not self.get_piece(start_row, 3):
                 if not self.is_square_attacked(start_row, 4, opponent_color) and \
                    not self.is_square_attacked(start_row, 3, opponent_color) and \
                    not self.is_square_attacked(start_row, 2, opponent_color):
                     return True
         return False
 
+    def generate_legal_moves(self, color):
+        # Yields (r_start, c_start, r_end, c_end) for every legal move of color.
+        # Checkers and pins are computed once, so candidates are filtered with
+        # bitboard masks instead of being played on the board.
+        side = COLOR_INDEX[color]
+        enemy = side ^ 1
+        bitboards = self.bitboards
+        king_sq = self.king_squares[side]
+        if king_sq is None:
+            evasion_mask = FULL
+            pins = {}
+            occupied_without_king = bitboards.all
+        else:
+            checkers = bitboards.attackers_to(king_sq, enemy)
+            if not checkers:
+                evasion_mask = FULL
+            elif checkers & (checkers - 1):
+                evasion_mask = 0  # Double check: only the king may move
+            else:
+                # Single check: capture the checker or block the line
+                evasion_mask = checkers | BETWEEN[king_sq][bit_scan(checkers)]
+            pins = bitboards.pinned(king_sq, side)
+            # The king must not be able to hide behind itself along a checking ray
+            occupied_without_king = bitboards.all & ~(1 << king_sq)
+
+        # Sorted so moves come out in board order, and as a copy so callers may play them while iterating
+        for sq in sorted(self.piece_squares[side]):
+            r_start, c_start = sq >> 3, sq & 7
+            piece = self.board[r_start][c_start]
+            if piece.kind == KING:
+                for r_end, c_end in piece.generate_moves(self, r_start, c_start):
+                    # Castling squares are already checked by _is_valid_castle
+                    if abs(c_end - c_start) == 2 or not bitboards.is_attacked(r_end * 8 + c_end, enemy, occupied_without_king):
+                        yield r_start, c_start, r_end, c_end
+                continue
+
+            allowed = evasion_mask & pins.get(sq, FULL)
+            if not allowed:
+                continue
+            for r_end, c_end in piece.generate_moves(self, r_start, c_start):
+                if allowed >> (r_end * 8 + c_end) & 1:
+                    yield r_start, c_start, r_end, c_end
+
+    def legal_move_index(self, color):
+        """ {(row, col): [(end_row, end_col), ...]} of color's legal moves, computed once per position;
+        shared with later callers, so don't modify it """
+        side = COLOR_INDEX[color]
+        cache = self._legal_move_index
+        if cache is None:
+            cache = self._legal_move_index = [None, None]
+        index = cache[side]
+        if index is None:
+            index = cache[side] = {}
+            for r_start, c_start, r_end, c_end in self.generate_legal_moves(color):
+                index.setdefault((r_start, c_start), []).append((r_end, c_end))
+        return index
+
     def get_all_possible_moves(self, color):
-        moves = []
-        for r_start, row in enumerate(self.board):
-            for c_start, piece in enumerate(row):
-                if piece and piece.color == color:
-                    for r_end in range(8):
-                        for c_end in range(8):
-                            if piece.is_valid_move(self, r_start, c_start, r_end, c_end):
-                                # Simulate the move to check if it leaves the king in check
-                                original_destination_piece = self.board[r_end][c_end]
-                                self.board[r_end][c_end] = piece
-                                self.board[r_start][c_start] = None
-                                
-                                if not self.is_in_check(color):
-                                    moves.append((self._coords_to_algebraic(r_start, c_start), self._coords_to_algebraic(r_end, c_end)))
-                                
-                                # Revert the board to its original state
-                                self.board[r_start][c_start] = piece
-                                self.board[r_end][c_end] = original_destination_piece
-        return moves
+        return [
+            (self._coords_to_algebraic(r_start, c_start), self._coords_to_algebraic(r_end, c_end))
+            for r_start, c_start, r_end, c_end in self.generate_legal_moves(color)
+        ]
     
     def is_checkmate(self, color):
-        return self.is_in_check(color) and not self.get_all_possible_moves(color)
+        return self.is_in_check(color) and not self.legal_move_index(color)
 
     def is_stalemate(self, color):
-        return not self.is_in_check(color) and not self.get_all_possible_moves(color)
+        return not self.is_in_check(color) and not self.legal_move_index(color)
+
+    def make_move(self, start_row, start_col, end_row, end_col):
+        """ Plays a move without any legality checks and returns the MoveRecord needed to take it back """
+        piece = self.board[start_row][start_col]
+        captured = self.board[end_row][end_col]
+
+        rook = None
+        rook_start_col = rook_end_col = None
+        if piece.kind == KING and abs(start_col - end_col) == 2:
+            if end_col == 6:  # Kingside
+                rook_start_col, rook_end_col = 7, 5
+            else:  # Queenside
+                rook_start_col, rook_end_col = 0, 3
+            rook = self.board[start_row][rook_start_col]
+
+        record = MoveRecord(
+            start_row, start_col, end_row, end_col, piece, captured,
+            rook, rook_start_col, rook_end_col,
+            piece.has_moved, rook.has_moved if rook else False,
+            len(self.white_captured), len(self.black_captured), self.turn, self.en_passant,
+        )
+
+        castling_before = self.castling_rights()
+        self.zobrist_key ^= self._en_passant_key()
+
+        self._set_square(start_row, start_col, None)
+        self._set_square(end_row, end_col, piece)
+        piece.has_moved = True
+
+        if rook:
+            self._set_square(start_row, rook_start_col, None)
+            self._set_square(start_row, rook_end_col, rook)
+            rook.has_moved = True
+        elif captured:  # Castling is not a capture
+            if captured.color == 'white':
+                self.black_captured.append(captured)
+            else:
+                self.white_captured.append(captured)
+
+        if piece.kind == PAWN and abs(start_row - end_row) == 2:
+            self.en_passant = ((start_row + end_row) // 2, start_col)
+        else:
+            self.en_passant = None
+        self.zobrist_key ^= self._en_passant_key()
+        self.zobrist_key ^= CASTLING_KEYS[castling_before] ^ CASTLING_KEYS[self.castling_rights()]
+
+        return record
+
+    def unmake_move(self, record):
+        """ Takes back a move played with make_move, restoring pieces, flags and captured lists """
+        castling_before = self.castling_rights()
+        self.zobrist_key ^= self._en_passant_key()
+
+        if record.rook:
+            self._set_square(record.start_row, record.rook_end_col, None)
+            self._set_square(record.start_row, record.rook_start_col, record.rook)
+            record.rook.has_moved = record.rook_had_moved
+
+        self._set_square(record.end_row, record.end_col, record.captured)
+        self._set_square(record.start_row, record.start_col, record.piece)
+        record.piece.has_moved = record.piece_had_moved
+
+        del self.white_captured[record.white_captured_len:]
+        del self.black_captured[record.black_captured_len:]
+
+        self.en_passant = record.en_passant
+        self.zobrist_key ^= self._en_passant_key()
+        self.zobrist_key ^= CASTLING_KEYS[castling_before] ^ CASTLING_KEYS[self.castling_rights()]
 
     def move_piece(self, start_pos, end_pos):
         start_row, start_col = self._algebraic_to_coords(start_pos)
@@ -167,53 +530,15 @@ class Board:
         if not (piece and piece.color == self.turn and piece.is_valid_move(self, start_row, start_col, end_row, end_col)):
             return False
 
-        is_castling = isinstance(piece, King) and abs(start_col - end_col) == 2
-
-        # Save state before making the move
-        current_state = {
-            'board_layout': copy.deepcopy(self.board),
-            'current_turn': self.turn,
-            'white_captured': list(self.white_captured),
-            'black_captured': list(self.black_captured),
-        }
-
-        # Make the move on a temporary board to check for checks
-        original_piece_at_dest = self.board[end_row][end_col]
-        self.board[start_row][start_col] = None
-        self.board[end_row][end_col] = piece
-
-        if is_castling:
-            if end_col == 6:  # Kingside
-                rook = self.get_piece(start_row, 7)
-                self.board[start_row][7] = None
-                self.board[start_row][5] = rook
-            elif end_col == 2:  # Queenside
-                rook = self.get_piece(start_row, 0)
-                self.board[start_row][0] = None
-                self.board[start_row][3] = rook
+        record = self.make_move(start_row, start_col, end_row, end_col)
 
         if self.is_in_check(self.turn):
-            # Revert changes on the board if the move is illegal
-            self.board = current_state['board_layout']
+            # Take the move back if it leaves our own king in check
+            self.unmake_move(record)
             return False
 
-        # If the move is legal, commit it and save history
-        self.history.append(current_state)
-        
-        # The move has already been made on self.board for the check, so we just need to update piece state
-        piece.has_moved = True
-        if is_castling:
-            if end_col == 6:  # Kingside
-                self.get_piece(start_row, 5).has_moved = True
-            elif end_col == 2:  # Queenside
-                self.get_piece(start_row, 3).has_moved = True
-
-        # Check for capture (castling is not a capture)
-        if not is_castling and original_piece_at_dest:
-            if original_piece_at_dest.color == 'white':
-                self.black_captured.append(original_piece_at_dest)
-            else:
-                self.white_captured.append(original_piece_at_dest)
+        # If the move is legal, save it for undo
+        self.history.append(record)
 
         # Log the move
         move_string = f"{start_pos}{end_pos}"
@@ -225,14 +550,28 @@ class Board:
             else:  # Should not happen, but as a fallback
                 self.move_log.append(['...', move_string])
 
-        piece.has_moved = True
         return True
         
+STRAIGHT_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = STRAIGHT_DIRECTIONS + DIAGONAL_DIRECTIONS
+
 class Piece:
+    # No per-instance __dict__: a piece is its color string, the matching COLOR_INDEX
+    # and the has_moved flag. Hot loops compare the small-int side instead of the strings.
+    __slots__ = ("color", "side", "has_moved")
+    SYMBOLS = ("?", "?")  # (white, black) display symbols
+
     def __init__(self, color):
         self.color = color
+        self.side = COLOR_INDEX[color]
         self.has_moved = False
 
+    @property
+    def symbol(self):
+        return self.SYMBOLS[self.side]
+
     def __repr__(self):
         return f"{self.color} {self.__class__.__name__}"
 
@@ -240,13 +579,40 @@ class Piece:
         # Base implementation: pieces don't move by default
         return False
 
+    def generate_moves(self, board, row, col):
+        # Yields the (end_row, end_col) squares this piece can reach, ignoring checks
+        return iter(())
+
+    def _step_moves(self, board, row, col, offsets):
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                target_piece = board.get_piece(r, c)
+                if target_piece is None or target_piece.side != self.side:
+                    yield r, c
+
+    def _slide_moves(self, board, row, col, directions):
+        for dr, dc in directions:
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                target_piece = board.get_piece(r, c)
+                if target_piece is None:
+                    yield r, c
+                else:
+                    if target_piece.side != self.side:
+                        yield r, c
+                    break
+                r += dr
+                c += dc
+
 class Pawn(Piece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.symbol = "♙" if color == "white" else "♟"
+    kind = bitboard.PAWN
+
+    __slots__ = ()
+    SYMBOLS = ("♙", "♟")
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
-        direction = -1 if self.color == "white" else 1
+        direction = -1 if self.side == WHITE else 1
         
         # Standard one-square move
         if start_col == end_col and start_row + direction == end_row and board.get_piece(end_row, end_col) is None:
@@ -260,23 +626,42 @@ class Pawn(Piece):
         # Capture move
         if abs(start_col - end_col) == 1 and start_row + direction == end_row:
             target_piece = board.get_piece(end_row, end_col)
-            if target_piece and target_piece.color != self.color:
+            if target_piece and target_piece.side != self.side:
                 return True
 
         return False
 
+    def generate_moves(self, board, row, col):
+        direction = -1 if self.side == WHITE else 1
+        next_row = row + direction
+        if not 0 <= next_row < 8:
+            return
+
+        if board.get_piece(next_row, col) is None:
+            yield next_row, col
+            two_rows = row + 2 * direction
+            if not self.has_moved and 0 <= two_rows < 8 and board.get_piece(two_rows, col) is None:
+                yield two_rows, col
+
+        for c in (col - 1, col + 1):
+            if 0 <= c < 8:
+                target_piece = board.get_piece(next_row, c)
+                if target_piece and target_piece.side != self.side:
+                    yield next_row, c
+
 
 class Rook(Piece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.symbol = "♖" if color == "white" else "♜"
+    kind = bitboard.ROOK
+
+    __slots__ = ()
+    SYMBOLS = ("♖", "♜")
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
         if start_row != end_row and start_col != end_col:
             return False
 
         target_piece = board.get_piece(end_row, end_col)
-        if target_piece and target_piece.color == self.color:
+        if target_piece and target_piece.side == self.side:
             return False
 
         if start_row == end_row:
@@ -292,10 +677,14 @@ class Rook(Piece):
         
         return True
 
+    def generate_moves(self, board, row, col):
+        return self._slide_moves(board, row, col, STRAIGHT_DIRECTIONS)
+
 class Knight(Piece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.symbol = "♘" if color == "white" else "♞"
+    kind = bitboard.KNIGHT
+
+    __slots__ = ()
+    SYMBOLS = ("♘", "♞")
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
         row_diff = abs(start_row - end_row)
@@ -305,22 +694,26 @@ class Knight(Piece):
             return False
 
         target_piece = board.get_piece(end_row, end_col)
-        if target_piece and target_piece.color == self.color:
+        if target_piece and target_piece.side == self.side:
             return False
 
         return True
 
+    def generate_moves(self, board, row, col):
+        return self._step_moves(board, row, col, KNIGHT_OFFSETS)
+
 class Bishop(Piece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.symbol = "♗" if color == "white" else "♝"
+    kind = bitboard.BISHOP
+
+    __slots__ = ()
+    SYMBOLS = ("♗", "♝")
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
         if abs(start_row - end_row) != abs(start_col - end_col):
             return False
 
         target_piece = board.get_piece(end_row, end_col)
-        if target_piece and target_piece.color == self.color:
+        if target_piece and target_piece.side == self.side:
             return False
 
         row_step = 1 if end_row > start_row else -1
@@ -334,10 +727,14 @@ class Bishop(Piece):
             
         return True
 
+    def generate_moves(self, board, row, col):
+        return self._slide_moves(board, row, col, DIAGONAL_DIRECTIONS)
+
 class Queen(Piece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.symbol = "♕" if color == "white" else "♛"
+    kind = bitboard.QUEEN
+
+    __slots__ = ()
+    SYMBOLS = ("♕", "♛")
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
         is_diagonal = abs(start_row - end_row) == abs(start_col - end_col)
@@ -346,7 +743,7 @@ class Queen(Piece):
             return False
 
         target_piece = board.get_piece(end_row, end_col)
-        if target_piece and target_piece.color == self.color:
+        if target_piece and target_piece.side == self.side:
             return False
 
         if is_straight:
@@ -372,10 +769,14 @@ class Queen(Piece):
         
         return True
 
+    def generate_moves(self, board, row, col):
+        return self._slide_moves(board, row, col, KING_OFFSETS)
+
 class King(Piece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.symbol = "♔" if color == "white" else "♚"
+    kind = bitboard.KING
+
+    __slots__ = ()
+    SYMBOLS = ("♔", "♚")
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
         row_diff = abs(start_row - end_row)
@@ -384,7 +785,7 @@ class King(Piece):
         # Standard king move
         if row_diff <= 1 and col_diff <= 1:
             target_piece = board.get_piece(end_row, end_col)
-            if target_piece and target_piece.color == self.color:
+            if target_piece and target_piece.side == self.side:
                 return False
             return True
 
@@ -393,3 +794,15 @@ class King(Piece):
             return board._is_valid_castle(start_row, start_col, end_row, end_col)
 
         return False
+
+    def generate_moves(self, board, row, col):
+        yield from self._step_moves(board, row, col, KING_OFFSETS)
+
+        # Castling
+        if not self.has_moved:
+            for end_col in (6, 2):
+                if board._is_valid_castle(row, col, row, end_col):
+                    yield row, end_col
+
+# Piece class of each kind, indexed by Piece.kind
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
@@ -0,0 +1,193 @@
+# Multiprocess perft and engine search, split at the root moves.
+#
+# Each root move from get_all_possible_moves becomes one task. Workers get the
+# position as the 34-byte Board.to_bytes() encoding instead of pickled Piece
+# objects, rebuild the board, play the root move and work on the subtree. Results come back in
+# root-move order, so totals and the chosen move do not depend on timing.
+#
+#   python parallel.py perft --depth 5 --workers 8
+#   python parallel.py scaling --depth 4
+#   python parallel.py verify --depth 3 --games 4
+
+import argparse
+import copy
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+import perft
+from models import START_FEN, Board
+
+# Transposition table size for each worker's engine; one subtree per task needs little
+WORKER_HASH_MB = 1
+
+
+def _play_root_move(position, move):
+    board = Board.from_bytes(position)
+    if not board.move_piece(*move):
+        raise AssertionError(f"root move {move[0]}{move[1]} rejected in {board.to_fen()}")
+    board.switch_turn()
+    return board
+
+
+def _perft_task(task):
+    position, move, depth = task
+    board = _play_root_move(position, move)
+    return perft.perft(board, depth)
+
+
+def parallel_perft(board, depth, workers=None):
+    """ Returns (total nodes, {root move: nodes}) computed with a process pool """
+    moves = board.get_all_possible_moves(board.turn)
+    if depth <= 1:
+        return len(moves), {start + end: 1 for start, end in moves}
+    position = board.to_bytes()
+    tasks = [(position, move, depth - 1) for move in moves]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(_perft_task, tasks))
+    divide = {start + end: count for (start, end), count in zip(moves, counts)}
+    return sum(counts), divide
+
+
+def _search_task(task):
+    position, move, time_ms, deadline = task
+    board = _play_root_move(position, move)
+    if board.is_checkmate(board.turn):
+        return engine.MATE_SCORE - 1, 0, 1
+    if board.is_stalemate(board.turn):
+        return 0, 0, 1
+    # Never run past the overall deadline, whichever round this task lands in
+    time_ms = max(1, min(time_ms, int((deadline - time.time()) * 1000)))
+    result = engine.Engine(WORKER_HASH_MB).search(board, time_ms)
+    # The worker searched from the opponent's point of view, one ply below the root
+    score = -result.score
+    if score >= engine.MATE_SCORE - engine.MAX_PLY:
+        score -= 1
+    elif score <= -engine.MATE_SCORE + engine.MAX_PLY:
+        score += 1
+    return score, result.depth + 1, result.nodes
+
+
+def parallel_search(board, time_ms, workers=None):
+    """ Root-split search: every root move is searched by a worker; returns a SearchResult """
+    start = time.perf_counter()
+    moves = board.get_all_possible_moves(board.turn)
+    if not moves:
+        return engine.SearchResult(None, 0, 0, 0, 0.0, 0.0)
+    workers = workers or os.cpu_count() or 1
+    rounds = -(-len(moves) // workers)
+    position = board.to_bytes()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Start the workers first so their startup comes out of the budget, then split
+        # what is left so all rounds of tasks together take about time_ms
+        list(pool.map(int, range(workers)))
+        remaining_ms = time_ms - (time.perf_counter() - start) * 1000
+        deadline = time.time() + remaining_ms / 1000
+        tasks = [(position, move, max(1, int(remaining_ms // rounds)), deadline) for move in moves]
+        results = list(pool.map(_search_task, tasks))
+
+    # Highest score wins; ties go to the earlier root move so the choice is deterministic
+    best_index = max(range(len(moves)), key=lambda i: (results[i][0], -i))
+    score, depth, _ = results[best_index]
+    nodes = sum(result[2] for result in results)
+    elapsed = time.perf_counter() - start
+    return engine.SearchResult(moves[best_index], score, depth, nodes, elapsed, nodes / elapsed if elapsed else 0.0)
+
+
+# Game openings replayed by verify(); the first leaves a bishop on h1 next to an unmoved king
+VERIFY_LINES = [
+    "g2g4 b7b6 g1h3 c8b7 f1g2 b7g2 h3g5 g2h1 a2a3 e7e6",
+    "e2e4 e7e5 g1f3 b8c6 f1c4 g8f6 e1g1 f8c5 d2d3 e8g8",
+]
+
+
+def verify(depth=3, games=4, plies=40, seed=0, workers=None):
+    """ Compares parallel_perft with the serial perft.divide on positions from played games;
+    raises AssertionError on the first difference and returns the number of positions checked """
+    rng = random.Random(seed)
+    boards = []
+    for line in VERIFY_LINES:
+        board = Board()
+        for move in line.split():
+            board.move_piece(move[:2], move[2:])
+            board.switch_turn()
+        boards.append(board)
+    for _ in range(games):
+        # Random games, checked every few plies so castling rights and moved pieces vary
+        board = Board()
+        for ply in range(plies):
+            moves = board.get_all_possible_moves(board.turn)
+            if not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+            board.switch_turn()
+            if ply % 10 == 9:
+                boards.append(copy.deepcopy(board))
+    for board in boards:
+        serial = perft.divide(board, depth)
+        total, divide = parallel_perft(board, depth, workers)
+        if divide != serial or total != sum(serial.values()):
+            raise AssertionError(f"parallel perft {total} != serial {sum(serial.values())} at depth {depth} for {board.to_fen()}")
+    return len(boards)
+
+
+def scaling_report(depth=4, fen=START_FEN, max_workers=None):
+    """ Times parallel perft at increasing worker counts and prints the speedup over one worker """
+    max_workers = max_workers or os.cpu_count() or 1
+    worker_counts = []
+    count = 1
+    while count < max_workers:
+        worker_counts.append(count)
+        count *= 2
+    worker_counts.append(max_workers)
+
+    baseline = None
+    print(f"perft depth {depth}: {fen}")
+    print(f"{'workers':>8} {'nodes':>12} {'seconds':>9} {'nodes/s':>10} {'speedup':>8}")
+    for workers in worker_counts:
+        board = Board.from_fen(fen)
+        start = time.perf_counter()
+        nodes, _ = parallel_perft(board, depth, workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:8d} {nodes:12d} {elapsed:9.2f} {nodes / elapsed:10.0f} {baseline / elapsed:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multiprocess perft and root-split search")
+    parser.add_argument("mode", choices=["perft", "search", "scaling", "verify"])
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--time", type=int, default=5000, help="search time in milliseconds")
+    parser.add_argument("--games", type=int, default=4, help="random games to take positions from in verify mode")
+    args = parser.parse_args()
+
+    if args.mode == "verify":
+        start = time.perf_counter()
+        checked = verify(args.depth, args.games, workers=args.workers)
+        print(f"{checked} positions from played games match serial perft at depth {args.depth} ({time.perf_counter() - start:.1f}s)")
+        return
+
+    if args.mode == "scaling":
+        scaling_report(args.depth, args.fen, args.workers)
+        return
+
+    board = Board.from_fen(args.fen)
+    if args.mode == "perft":
+        start = time.perf_counter()
+        nodes, divide = parallel_perft(board, args.depth, args.workers)
+        elapsed = time.perf_counter() - start
+        for move, count in sorted(divide.items()):
+            print(f"{move}: {count}")
+        print(f"Nodes: {nodes}  Time: {elapsed:.2f}s  Nodes/s: {nodes / elapsed if elapsed else 0:.0f}")
+    else:
+        result = parallel_search(board, args.time, args.workers)
+        print(f"Best move: {result.move[0]}{result.move[1]}  score {result.score}  depth {result.depth}  "
+              f"{result.nodes} nodes in {result.elapsed:.2f}s ({result.nps:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Perft: count the leaf nodes of the legal move tree to a fixed depth.
+#
+# This is the correctness and speed gate for the move generator. The
+# reference counts below follow this game's rules, which have no en-passant
+# captures and no promotions (a pawn on the last rank stays there). Where a
+# position is also a standard test position, its counts therefore differ
+# from the published ones once those moves appear in the tree.
+#
+#   python perft.py --suite             run every reference position
+#   python perft.py --suite --max-depth 3
+#   python perft.py --depth 4 --divide  per-root-move counts from the start
+
+import argparse
+import sys
+import time
+
+from models import START_FEN, Board
+import zobrist
+
+# name -> (fen, [nodes at depth 1, 2, ...])
+REFERENCE_POSITIONS = {
+    "start": (START_FEN, [20, 400, 8902, 197281, 4865351]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2038, 97766]),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2810, 43087]),
+    "castling": ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", [26, 568, 13744, 314346]),
+    "discovered_pin": ("3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", [18, 92, 1670, 10080]),
+    "last_rank_pawns": ("4k3/P7/8/8/8/8/6p1/4K3 w - - 0 1", [5, 30, 213, 1545, 11590]),
+}
+
+def perft(board, depth, check_hash=False):
+    if depth == 0:
+        return 1
+    moves = list(board.generate_legal_moves(board.turn))
+    if depth == 1 and not check_hash:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        record = board.make_move(*move)
+        board.switch_turn()
+        if check_hash:
+            zobrist.verify(board)
+        nodes += perft(board, depth - 1, check_hash)
+        board.switch_turn()
+        board.unmake_move(record)
+    return nodes
+
+
+def divide(board, depth):
+    """ Node counts split by root move, keyed by coordinate notation like 'e2e4' """
+    counts = {}
+    for move in list(board.generate_legal_moves(board.turn)):
+        record = board.make_move(*move)
+        board.switch_turn()
+        counts[board._coords_to_algebraic(move[0], move[1]) + board._coords_to_algebraic(move[2], move[3])] = perft(board, depth - 1)
+        board.switch_turn()
+        board.unmake_move(record)
+    return counts
+
+
+def run_suite(max_depth=None, check_hash=False, out=sys.stdout):
+    """ Checks every reference position; returns True when all counts match """
+    ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, (fen, expected_counts) in REFERENCE_POSITIONS.items():
+        for depth, expected in enumerate(expected_counts, start=1):
+            if max_depth is not None and depth > max_depth:
+                break
+            board = Board.from_fen(fen)
+            start = time.perf_counter()
+            nodes = perft(board, depth, check_hash)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+            ok = ok and nodes == expected
+            print(f"{name:16s} depth {depth}: {nodes:10d} nodes {elapsed:8.2f}s {nodes / elapsed if elapsed else 0:10.0f} nodes/s  {status}", file=out)
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s ({total_nodes / total_time if total_time else 0:.0f} nodes/s)", file=out)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft move generator checks")
+    parser.add_argument("--fen", default=START_FEN, help="position to count from (default: start)")
+    parser.add_argument("--position", choices=sorted(REFERENCE_POSITIONS), help="use a named reference position")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--divide", action="store_true", help="print counts per root move")
+    parser.add_argument("--suite", action="store_true", help="run all reference positions and compare counts")
+    parser.add_argument("--max-depth", type=int, help="deepest depth to run in --suite")
+    parser.add_argument("--check-hash", action="store_true", help="verify the Zobrist key at every node")
+    args = parser.parse_args()
+
+    if args.suite:
+        sys.exit(0 if run_suite(args.max_depth, args.check_hash) else 1)
+
+    fen = REFERENCE_POSITIONS[args.position][0] if args.position else args.fen
+    board = Board.from_fen(fen)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(board, args.depth)
+        for move, count in sorted(counts.items()):
+            print(f"{move}: {count}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(board, args.depth, args.check_hash)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}  Time: {elapsed:.2f}s  Nodes/s: {nodes / elapsed if elapsed else 0:.0f}")
+
+
+if __name__ == "__main__":
+    main()
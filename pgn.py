@@ -0,0 +1,291 @@
+# Streaming PGN reader and writer.
+#
+# read_games() walks a PGN file line by line and yields one PGNGame at a
+# time, so only the game being parsed is held in memory regardless of the
+# file size. replay() plays a game's SAN moves through models.Board, and
+# write_game() turns a Board.move_log back into PGN.
+#
+# Games using rules this board does not implement (promotion, en passant)
+# raise PGNError when replayed.
+#
+#   python pgn.py replay games.pgn        replay every game and report games/second
+#   python pgn.py export games.pgn        re-emit the games from their replayed move logs
+
+import argparse
+import re
+import sys
+import time
+from collections import namedtuple
+
+from models import FEN_LETTERS, START_FEN, Board
+
+PGNGame = namedtuple('PGNGame', ['headers', 'moves', 'result'])
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+
+_HEADER_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_SAN_RE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(=[NBRQ])?$')
+_MOVE_NUMBER_RE = re.compile(r'^\d+\.+')
+
+
+class PGNError(Exception):
+    pass
+
+
+def _tokenize(text, state):
+    # Splits movetext into SAN tokens, skipping comments, variations, NAGs and move numbers.
+    # state carries open comment/variation depth across lines.
+    tokens = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if state['comment']:
+            end = text.find('}', i)
+            if end < 0:
+                break
+            state['comment'] = False
+            i = end + 1
+            continue
+        if char == '{':
+            state['comment'] = True
+            i += 1
+        elif char == ';':
+            break
+        elif char == '(':
+            state['variation'] += 1
+            i += 1
+        elif char == ')':
+            state['variation'] = max(0, state['variation'] - 1)
+            i += 1
+        elif char.isspace():
+            i += 1
+        else:
+            j = i
+            while j < len(text) and not text[j].isspace() and text[j] not in '{}();':
+                j += 1
+            token = text[i:j]
+            i = j
+            if state['variation'] or token.startswith('$') or not token.strip('.'):
+                continue
+            # "12.e4" and "12...e5" carry the move on the same token
+            number = _MOVE_NUMBER_RE.match(token)
+            if number:
+                token = token[number.end():]
+                if not token:
+                    continue
+            tokens.append(token)
+    return tokens
+
+
+def read_games(stream):
+    """ Yields PGNGame tuples from a text stream, one game at a time """
+    headers = {}
+    moves = []
+    state = {'comment': False, 'variation': 0}
+    in_movetext = False
+
+    for line in stream:
+        stripped = line.strip()
+        if not state['comment'] and stripped.startswith('[') and not state['variation']:
+            if in_movetext:
+                # A header after movetext without a result token starts a new game
+                yield PGNGame(headers, moves, headers.get("Result", "*"))
+                headers, moves, in_movetext = {}, [], False
+            match = _HEADER_RE.match(stripped)
+            if match:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+            continue
+        if not stripped and not state['comment']:
+            continue
+        if stripped.startswith('%'):
+            continue
+
+        in_movetext = True
+        for token in _tokenize(line, state):
+            if token in RESULTS:
+                yield PGNGame(headers, moves, token)
+                headers, moves, in_movetext = {}, [], False
+                state = {'comment': False, 'variation': 0}
+            else:
+                moves.append(token)
+
+    if in_movetext or headers:
+        yield PGNGame(headers, moves, headers.get("Result", "*"))
+
+
+def san_to_move(board, san):
+    """ Resolves a SAN move for the side to move into (start, end) algebraic squares """
+    text = san.rstrip('+#!?')
+    color = board.turn
+    home = "1" if color == "white" else "8"
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        # Checked against the legal moves like any other move
+        row = 7 if color == "white" else 0
+        end_col = 6 if text in ("O-O", "0-0") else 2
+        if (row, 4, row, end_col) not in board.generate_legal_moves(color):
+            raise PGNError(f"Illegal move {san!r} in {board.to_fen()}")
+        return f"e{home}", board._coords_to_algebraic(row, end_col)
+
+    match = _SAN_RE.match(text)
+    if not match:
+        raise PGNError(f"Cannot parse move {san!r}")
+    piece_letter, from_file, from_rank, _, target, promotion = match.groups()
+    if promotion:
+        raise PGNError(f"Promotion is not supported: {san!r}")
+
+    kind = FEN_LETTERS.index((piece_letter or 'P').lower())
+    end_row, end_col = board._algebraic_to_coords(target)
+    candidates = []
+    for r_start, c_start, r_end, c_end in board.generate_legal_moves(color):
+        if (r_end, c_end) != (end_row, end_col) or board.board[r_start][c_start].kind != kind:
+            continue
+        start = board._coords_to_algebraic(r_start, c_start)
+        if from_file and start[0] != from_file or from_rank and start[1] != from_rank:
+            continue
+        candidates.append(start)
+    if not candidates:
+        raise PGNError(f"Illegal move {san!r} in {board.to_fen()}")
+    if len(candidates) > 1:
+        raise PGNError(f"Ambiguous move {san!r} in {board.to_fen()}")
+    return candidates[0], target
+
+
+def move_to_san(board, start, end):
+    """ SAN for the move start-end by the side to move, e.g. 'Nbd7', 'exd5', 'O-O', 'Qh4#' """
+    start_row, start_col = board._algebraic_to_coords(start)
+    end_row, end_col = board._algebraic_to_coords(end)
+    piece = board.board[start_row][start_col]
+    capture = board.board[end_row][end_col] is not None
+
+    if FEN_LETTERS[piece.kind] == 'k' and abs(start_col - end_col) == 2:
+        san = "O-O" if end_col == 6 else "O-O-O"
+    elif FEN_LETTERS[piece.kind] == 'p':
+        san = f"{start[0]}x{end}" if capture else end
+    else:
+        others = [
+            board._coords_to_algebraic(r, c)
+            for r, c, r_end, c_end in board.generate_legal_moves(board.turn)
+            if (r_end, c_end) == (end_row, end_col) and (r, c) != (start_row, start_col) and board.board[r][c].kind == piece.kind
+        ]
+        disambiguation = ""
+        if others:
+            if all(other[0] != start[0] for other in others):
+                disambiguation = start[0]
+            elif all(other[1] != start[1] for other in others):
+                disambiguation = start[1]
+            else:
+                disambiguation = start
+        san = f"{FEN_LETTERS[piece.kind].upper()}{disambiguation}{'x' if capture else ''}{end}"
+
+    record = board.make_move(start_row, start_col, end_row, end_col)
+    board.switch_turn()
+    if board.is_in_check(board.turn):
+        san += "#" if board.is_checkmate(board.turn) else "+"
+    board.switch_turn()
+    board.unmake_move(record)
+    return san
+
+
+def replay(game):
+    """ Plays a PGNGame through a Board and returns the board """
+    try:
+        board = Board.from_fen(game.headers["FEN"]) if "FEN" in game.headers else Board()
+    except ValueError as error:
+        raise PGNError(f"Bad FEN header: {error}") from error
+    for san in game.moves:
+        start, end = san_to_move(board, san)
+        if not board.move_piece(start, end):
+            raise PGNError(f"Move {san!r} rejected in {board.to_fen()}")
+        board.switch_turn()
+    return board
+
+
+def game_result(board):
+    if board.is_checkmate(board.turn):
+        return "0-1" if board.turn == "white" else "1-0"
+    if board.is_stalemate(board.turn):
+        return "1/2-1/2"
+    return "*"
+
+
+def write_game(stream, move_log, headers=None, fen=None):
+    """ Writes a Board.move_log (coordinate pairs like 'e2e4') as one PGN game """
+    board = Board.from_fen(fen) if fen else Board()
+    tokens = []
+    number = board.first_fullmove
+    for pair in move_log:
+        for index, move in enumerate(pair):
+            if move == '...':
+                tokens.append(f"{number}...")
+                continue
+            if index == 0:
+                tokens.append(f"{number}.")
+            tokens.append(move_to_san(board, move[:2], move[2:]))
+            if not board.move_piece(move[:2], move[2:]):
+                raise PGNError(f"Move {move} in move log is illegal in {board.to_fen()}")
+            board.switch_turn()
+        number += 1
+
+    headers = dict(headers or {})
+    for tag in SEVEN_TAG_ROSTER:
+        headers.setdefault(tag, "?")
+    if headers["Result"] == "?":
+        headers["Result"] = game_result(board)
+    if fen and fen != START_FEN:
+        headers.setdefault("SetUp", "1")
+        headers.setdefault("FEN", fen)
+    tokens.append(headers["Result"])
+
+    for tag in list(SEVEN_TAG_ROSTER) + [tag for tag in headers if tag not in SEVEN_TAG_ROSTER]:
+        value = headers[tag].replace('\\', '\\\\').replace('"', '\\"')
+        stream.write(f'[{tag} "{value}"]\n')
+    stream.write("\n")
+
+    # Movetext lines are kept under 80 characters
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            stream.write(line + "\n")
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    stream.write(line + "\n\n")
+
+
+def replay_file(path, out=sys.stdout, export=None):
+    """ Replays every game in path and reports games/second; returns (games, failed) """
+    games = failed = moves = 0
+    start = time.perf_counter()
+    with open(path, encoding="utf-8", errors="replace") as stream:
+        for game in read_games(stream):
+            games += 1
+            try:
+                board = replay(game)
+            except PGNError as error:
+                failed += 1
+                print(f"game {games}: {error}", file=sys.stderr)
+                continue
+            moves += len(game.moves)
+            if export:
+                write_game(export, board.move_log, game.headers, game.headers.get("FEN"))
+    elapsed = time.perf_counter() - start
+    print(f"{games} games ({failed} failed), {moves} moves in {elapsed:.2f}s: "
+          f"{games / elapsed if elapsed else 0:.1f} games/s, {moves / elapsed if elapsed else 0:.0f} moves/s", file=out)
+    return games, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and export PGN files")
+    parser.add_argument("mode", choices=["replay", "export"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.mode == "export":
+        replay_file(args.path, out=sys.stderr, export=sys.stdout)
+    else:
+        replay_file(args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Retrograde endgame tablebases for king + one piece against a lone king.
+#
+# Tables are generated locally from the models move rules: worker processes
+# list the legal moves of every position of a material set with
+# Board.generate_legal_moves, then the parent walks back from the checkmates
+# to find the distance to mate of every won position.
+#
+# Each table covers the positions where white has the extra piece; positions
+# where black has it are looked up with the board mirrored top to bottom and
+# the colors swapped. Since pawns never promote here, KPK is a table of
+# checkmates and draws like the others.
+#
+# File format: a 4-byte magic, the 4-byte padded table name, then one byte
+# per index, where index = ((strong_king * 64 + weak_king) * 64 + piece) * 2 + side,
+# squares as in Board (sq = row * 8 + col) and side 0 when white is to move:
+#   0          draw
+#   1 .. 254   white mates in (value - 1) plies
+#   255        not a legal position
+#
+#   python tablebase.py generate --workers 8
+#   python tablebase.py probe --fen "8/8/8/4k3/8/8/8/4K2Q w - - 0 1"
+
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BLACK, COLOR_INDEX, KING, KING_ATTACKS, PAWN, QUEEN, ROOK, WHITE, bit_scan, popcount
+from models import PIECE_CLASSES, Board, King
+
+TABLES = {"KQK": QUEEN, "KRK": ROOK, "KPK": PAWN}
+DEFAULT_DIRECTORY = "tablebases"
+MAGIC = b"CTB1"
+HEADER = struct.Struct("4s4s")
+SIZE = 64 * 64 * 64 * 2
+
+DRAW = 0
+INVALID = 0xFF
+# Successor marker for a move that captures the extra piece, which leaves a drawn KK ending
+_CAPTURE = 0xFFFFFFFF
+
+# Statuses reported by the move-listing workers
+_ILLEGAL, _MOVES, _MATED, _STALEMATE = range(4)
+
+
+def index_of(strong_king, weak_king, piece, side):
+    return ((strong_king * 64 + weak_king) * 64 + piece) * 2 + side
+
+
+def _setup(board, kind, strong_king, weak_king, piece):
+    # Places the three pieces on an empty board; no castling, pawns unmoved only on their start row
+    pieces = [(strong_king, King("white")), (weak_king, King("black")), (piece, PIECE_CLASSES[kind]("white"))]
+    for sq, placed in pieces:
+        placed.has_moved = not (placed.kind == PAWN and sq >> 3 == 6)
+        board._set_square(sq >> 3, sq & 7, placed)
+
+
+def _clear(board, squares):
+    for sq in squares:
+        board._set_square(sq >> 3, sq & 7, None)
+
+
+def _list_moves(task):
+    # Worker: (statuses, successor counts, flat successor indices) for indices in [start, stop)
+    kind, start, stop = task
+    board = Board.__new__(Board)
+    board._init_empty()
+    statuses = bytearray(stop - start)
+    counts = array('B', bytes(stop - start))
+    successors = array('I')
+    for index in range(start, stop):
+        side = index & 1
+        piece = index >> 1 & 63
+        weak_king = index >> 7 & 63
+        strong_king = index >> 13
+        if len({strong_king, weak_king, piece}) < 3 or KING_ATTACKS[strong_king] >> weak_king & 1:
+            continue
+        if kind == PAWN and piece >> 3 == 7:  # A white pawn can never stand on its own first rank
+            continue
+
+        _setup(board, kind, strong_king, weak_king, piece)
+        board.turn = "white" if side == WHITE else "black"
+        waiting = "black" if side == WHITE else "white"
+        if board.is_in_check(waiting):
+            _clear(board, (strong_king, weak_king, piece))
+            continue
+
+        moves = list(board.generate_legal_moves(board.turn))
+        offset = index - start
+        if not moves:
+            statuses[offset] = _MATED if board.is_in_check(board.turn) else _STALEMATE
+        else:
+            statuses[offset] = _MOVES
+            counts[offset] = len(moves)
+            for start_row, start_col, end_row, end_col in moves:
+                origin, target = start_row * 8 + start_col, end_row * 8 + end_col
+                if side == WHITE:
+                    if origin == strong_king:
+                        successors.append(index_of(target, weak_king, piece, BLACK))
+                    else:
+                        successors.append(index_of(strong_king, weak_king, target, BLACK))
+                elif target == piece:
+                    successors.append(_CAPTURE)
+                else:
+                    successors.append(index_of(strong_king, target, piece, WHITE))
+        _clear(board, (strong_king, weak_king, piece))
+    return bytes(statuses), counts, successors
+
+
+def generate(name, workers=None, chunk_size=4096):
+    """ Builds the table for name ('KQK', 'KRK' or 'KPK') and returns it as a bytearray """
+    kind = TABLES[name]
+    tasks = [(kind, start, min(SIZE, start + chunk_size)) for start in range(0, SIZE, chunk_size)]
+    statuses = bytearray(SIZE)
+    remaining = array('B', bytes(SIZE))  # Unresolved moves of each position, used for black to move
+    chunks = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for (_, start, stop), (chunk_statuses, counts, successors) in zip(tasks, pool.map(_list_moves, tasks)):
+            statuses[start:stop] = chunk_statuses
+            remaining[start:stop] = counts
+            chunks.append((start, counts, successors))
+
+    # Invert the move lists into one flat predecessor array: the predecessors of
+    # index are predecessors[first[index]:first[index + 1]]
+    first = array('I', bytes(4 * (SIZE + 1)))
+    for _, _, successors in chunks:
+        for successor in successors:
+            if successor != _CAPTURE:
+                first[successor + 1] += 1
+    for index in range(SIZE):
+        first[index + 1] += first[index]
+    fill = array('I', first)
+    predecessors = array('I', bytes(4 * first[SIZE]))
+    for start, counts, successors in chunks:
+        cursor = 0
+        for position, count in enumerate(counts, start):
+            for successor in successors[cursor:cursor + count]:
+                if successor != _CAPTURE:
+                    predecessors[fill[successor]] = position
+                    fill[successor] += 1
+            cursor += count
+
+    # Breadth-first from the mates: a white-to-move position is won as soon as one
+    # move reaches a lost black position, a black-to-move position is lost once
+    # every one of its moves reaches a won white position.
+    table = bytearray(SIZE)
+    queue = deque()
+    for index in range(SIZE):
+        if statuses[index] == _ILLEGAL:
+            table[index] = INVALID
+        elif statuses[index] == _MATED:
+            table[index] = 1
+            queue.append(index)
+    while queue:
+        index = queue.popleft()
+        value = table[index] + 1
+        for predecessor in predecessors[first[index]:first[index + 1]]:
+            if table[predecessor]:
+                continue
+            if predecessor & 1 == WHITE:
+                table[predecessor] = value
+                queue.append(predecessor)
+            else:
+                remaining[predecessor] -= 1
+                if not remaining[predecessor]:
+                    table[predecessor] = value
+                    queue.append(predecessor)
+    return table
+
+
+def save(name, table, directory=DEFAULT_DIRECTORY):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{name}.tb"), "wb") as out:
+        out.write(HEADER.pack(MAGIC, name.encode()))
+        out.write(table)
+
+
+class Tablebase:
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.tables = {}
+        for name, kind in TABLES.items():
+            path = os.path.join(directory, f"{name}.tb")
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as stream:
+                magic, stored_name = HEADER.unpack(stream.read(HEADER.size))
+                data = stream.read()
+            if magic != MAGIC or stored_name.rstrip(b"\0").decode() != name or len(data) != SIZE:
+                raise ValueError(f"{path} is not a {name} tablebase")
+            self.tables[kind] = data
+
+    def probe(self, board):
+        """ (outcome, plies to mate) for the side to move, outcome 1 if it mates, -1 if it gets mated
+        and 0 for a draw (plies 0); None if the position is not covered """
+        bitboards = board.bitboards
+        occupied = bitboards.all
+        if popcount(occupied) > 3 or board.castling_rights():
+            return None
+        if popcount(occupied) == 2:
+            return 0, 0  # Bare kings
+        extra = bit_scan(occupied & ~(bitboards.pieces[WHITE][KING] | bitboards.pieces[BLACK][KING]))
+        piece = board.board[extra >> 3][extra & 7]
+        data = self.tables.get(piece.kind)
+        if data is None:
+            return None
+        strong = piece.side
+
+        # Tables are stored with white as the strong side; mirror the board for black
+        flip = 56 if strong == BLACK else 0
+        side = COLOR_INDEX[board.turn] ^ strong
+        value = data[index_of(
+            board.king_squares[strong] ^ flip,
+            board.king_squares[strong ^ 1] ^ flip,
+            extra ^ flip,
+            side,
+        )]
+        if value == INVALID:
+            return None
+        if value == DRAW:
+            return 0, 0
+        return (1 if side == WHITE else -1), value - 1
+
+    def adjudicate(self, board):
+        """ '1/2-1/2' for positions the tables show as drawn, else None (wins are played out) """
+        result = self.probe(board)
+        return "1/2-1/2" if result and result[0] == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and probe endgame tablebases")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    generate_parser = subparsers.add_parser("generate", help="build tables with a process pool")
+    generate_parser.add_argument("--tables", nargs="+", choices=sorted(TABLES), default=sorted(TABLES))
+    generate_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    generate_parser.add_argument("--dir", default=DEFAULT_DIRECTORY)
+    probe_parser = subparsers.add_parser("probe", help="look up a position")
+    probe_parser.add_argument("--fen", required=True)
+    probe_parser.add_argument("--dir", default=DEFAULT_DIRECTORY)
+    args = parser.parse_args()
+
+    if args.mode == "generate":
+        for name in args.tables:
+            start = time.perf_counter()
+            table = generate(name, args.workers)
+            save(name, table, args.dir)
+            legal = SIZE - table.count(INVALID)
+            won = legal - table.count(DRAW)
+            longest = max((value - 1 for value in table if value != INVALID and value != DRAW), default=0)
+            print(f"{name}: {legal} positions, {won} won, longest mate {longest} plies, "
+                  f"{time.perf_counter() - start:.1f}s", file=sys.stderr)
+        return
+
+    result = Tablebase(args.dir).probe(Board.from_fen(args.fen))
+    if result is None:
+        print("not in the tablebases")
+    elif result[0] == 0:
+        print("draw")
+    else:
+        print(f"{'side to move mates' if result[0] > 0 else 'side to move is mated'} in {result[1]} plies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Fixed-size transposition table for the engine, keyed by Board.zobrist_key.
+#
+# Entries live in two preallocated arrays of 64-bit words (key, packed data),
+# so memory use is set once by the MB cap and never grows during a game.
+# Each bucket holds two entries: a depth-preferred slot and an always-replace
+# slot.
+
+from array import array
+
+# Score bound types
+EXACT, LOWER, UPPER = 1, 2, 3
+
+ENTRY_BYTES = 16  # 8-byte key + 8-byte packed data
+BUCKET_SIZE = 2
+
+# Packed data layout (low to high bits):
+#   score + SCORE_OFFSET : 32 bits
+#   depth                :  8 bits
+#   bound type           :  2 bits (0 marks an empty slot)
+#   age                  :  8 bits
+#   move + 1             : 13 bits (0 means no move; from_sq * 64 + to_sq otherwise)
+SCORE_OFFSET = 1 << 31
+_DEPTH_SHIFT = 32
+_FLAG_SHIFT = 40
+_AGE_SHIFT = 42
+_MOVE_SHIFT = 50
+
+
+def _encode_move(move):
+    if move is None:
+        return 0
+    start_row, start_col, end_row, end_col = move
+    return (start_row * 8 + start_col) * 64 + end_row * 8 + end_col + 1
+
+
+def _decode_move(code):
+    if not code:
+        return None
+    start, end = divmod(code - 1, 64)
+    return start // 8, start % 8, end // 8, end % 8
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+        entries = self.buckets * BUCKET_SIZE
+        self.keys = array('Q', bytes(8 * entries))
+        self.data = array('Q', bytes(8 * entries))
+        self.age = 0
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0  # Probes that found the bucket holding other positions
+        self.stores = 0
+
+    def clear(self):
+        entries = self.buckets * BUCKET_SIZE
+        self.keys = array('Q', bytes(8 * entries))
+        self.data = array('Q', bytes(8 * entries))
+        self.age = 0
+        self.reset_counters()
+
+    def new_search(self):
+        # Entries from earlier searches become the first to be replaced
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key):
+        """ Returns (depth, bound, score, move) for key, or None """
+        index = (key % self.buckets) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        occupied = False
+        for slot in range(index, index + BUCKET_SIZE):
+            word = data[slot]
+            if not word:
+                continue
+            if keys[slot] == key:
+                self.hits += 1
+                return (
+                    word >> _DEPTH_SHIFT & 0xFF,
+                    word >> _FLAG_SHIFT & 0x3,
+                    (word & 0xFFFFFFFF) - SCORE_OFFSET,
+                    _decode_move(word >> _MOVE_SHIFT),
+                )
+            occupied = True
+        self.misses += 1
+        if occupied:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        index = (key % self.buckets) * BUCKET_SIZE
+        word = (
+            (score + SCORE_OFFSET)
+            | min(depth, 0xFF) << _DEPTH_SHIFT
+            | bound << _FLAG_SHIFT
+            | self.age << _AGE_SHIFT
+            | _encode_move(move) << _MOVE_SHIFT
+        )
+        preferred = self.data[index]
+        # The depth-preferred slot is kept unless the new entry is at least as deep,
+        # refers to the same position, or the old entry is from an earlier search
+        if (
+            not preferred
+            or self.keys[index] == key
+            or depth >= (preferred >> _DEPTH_SHIFT & 0xFF)
+            or (preferred >> _AGE_SHIFT & 0xFF) != self.age
+        ):
+            slot = index
+        else:
+            slot = index + 1
+        self.keys[slot] = key
+        self.data[slot] = word
+        self.stores += 1
+
+    def hashfull(self):
+        """ Permille of sampled entries used by the current search """
+        sample = min(1000, len(self.data))
+        used = sum(1 for word in self.data[:sample] if word and (word >> _AGE_SHIFT & 0xFF) == self.age)
+        return used * 1000 // sample
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'size_mb': self.size_mb,
+            'entries': len(self.data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'hashfull': self.hashfull(),
+        }
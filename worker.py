@@ -0,0 +1,96 @@
+# Background engine thread for the pygame loop.
+#
+# The main loop hands jobs (an engine move, a hint for the human, an
+# evaluation) to EngineWorker.submit() and picks finished results up with
+# poll() once per frame, so drawing and input never wait for the engine.
+# pending() tells the loop whether a result is still to come, so it only
+# blocks waiting for input when there is none.
+# The worker searches its own copy of the position, rebuilt from
+# Board.to_bytes(), and never touches the game's Board.
+#
+# cancel() drops the job in progress when the position changes under it
+# (a move or an undo): a running search is stopped through
+# Engine.stop_event and its result is never returned by poll().
+#
+# A job that raises is logged to stderr and reported by poll() as
+# (ERROR, (kind, exception)), so the thread keeps serving jobs and
+# pending() does not stay True forever.
+
+import queue
+import threading
+import traceback
+
+import evaluation
+from models import Board
+
+MOVE, HINT, EVALUATION, ERROR = "move", "hint", "evaluation", "error"
+
+
+class EngineWorker:
+    def __init__(self, computer):
+        self.engine = computer
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._current = 0  # Id of the newest job; results of older jobs are dropped
+        self._delivered = 0  # Id of the newest job whose result poll() has returned
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="engine-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, board, time_ms=1000):
+        """ Queues a MOVE, HINT or EVALUATION job for board, replacing any job still pending """
+        with self._lock:
+            self._current += 1
+            job_id = self._current
+        self.engine.stop_event.set()  # A newer position makes the running job pointless
+        self._jobs.put((job_id, kind, board.to_bytes(), time_ms))
+        return job_id
+
+    def cancel(self):
+        """ Stops the running job and forgets every pending one """
+        with self._lock:
+            self._current += 1
+            self._delivered = self._current  # Nothing left to wait for
+        self.engine.stop_event.set()
+
+    def pending(self):
+        """ True while the newest job is queued or running, or its result has not been polled yet """
+        return self._delivered != self._current
+
+    def poll(self):
+        """ (kind, result) of the newest job once it is done, else None; never blocks """
+        while True:
+            try:
+                job_id, kind, result = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if job_id == self._current:
+                self._delivered = job_id
+                return kind, result
+
+    def close(self):
+        self.cancel()
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job_id, kind, position, time_ms = job
+            # Clear before checking the id: a cancel() after this point sets the event again
+            self.engine.stop_event.clear()
+            if job_id != self._current:
+                continue
+            try:
+                board = Board.from_bytes(position)
+                if kind == EVALUATION:
+                    result = evaluation.breakdown(board)
+                else:
+                    result = self.engine.search(board, time_ms)
+            except Exception as error:
+                traceback.print_exc()
+                self._results.put((job_id, ERROR, (kind, error)))
+                continue
+            self._results.put((job_id, kind, result))
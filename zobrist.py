@@ -0,0 +1,41 @@
+# Zobrist keys for identifying Board positions with a single 64-bit integer.
+#
+# Board keeps board.zobrist_key up to date incrementally; compute_key() builds
+# the same key from scratch and is used to set it up and to verify it.
+
+import random
+
+_rng = random.Random(0x5EED)
+
+# PIECE_KEYS[color][kind][sq]
+PIECE_KEYS = [[[_rng.getrandbits(64) for _ in range(64)] for _ in range(6)] for _ in range(2)]
+# XORed in when black is to move
+SIDE_KEY = _rng.getrandbits(64)
+# Castling rights bits: white kingside, white queenside, black kingside, black queenside
+_CASTLING_BIT_KEYS = [_rng.getrandbits(64) for _ in range(4)]
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            CASTLING_KEYS[_rights] ^= _CASTLING_BIT_KEYS[_bit]
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+
+
+def compute_key(board):
+    key = 0
+    for r, row in enumerate(board.board):
+        for c, piece in enumerate(row):
+            if piece:
+                key ^= PIECE_KEYS[piece.side][piece.kind][r * 8 + c]
+    if board.turn == "black":
+        key ^= SIDE_KEY
+    key ^= CASTLING_KEYS[board.castling_rights()]
+    key ^= board._en_passant_key()
+    return key
+
+
+def verify(board):
+    """ Raises AssertionError if the incremental key drifted from a full recomputation """
+    expected = compute_key(board)
+    if board.zobrist_key != expected:
+        raise AssertionError(f"Zobrist key mismatch: {board.zobrist_key:016x} != {expected:016x} after {board.move_log}")